@@ -0,0 +1,39 @@
+"""time the color selector's color conversion functions
+run `python scripts/benchmark_color_conversions.py` (pillow must be
+installed); prints the best of 5 runs in microseconds per color
+"""
+
+import pathlib
+import sys
+from timeit import Timer
+
+PICKER = pathlib.Path(__file__).parents[1] / "thonnycontrib/thonny-py5mode/py5colorpicker"
+sys.path.insert(0, str(PICKER))
+
+from tkcolorpicker.functions import hsv_to_rgb, hue2col, rgb_to_hexa, rgb_to_hsv
+
+RGB = [(i, (i * 7) % 256, (i * 13) % 256) for i in range(256)]
+HSV = [(i % 361, i % 101, (i * 3) % 101) for i in range(256)]
+HUES = list(range(361))
+
+BENCHMARKS = {
+    "rgb_to_hsv": lambda: [rgb_to_hsv(*c) for c in RGB],
+    "hsv_to_rgb": lambda: [hsv_to_rgb(*c) for c in HSV],
+    "rgb_to_hexa": lambda: [rgb_to_hexa(*c) for c in RGB],
+    "hue2col": lambda: [hue2col(h) for h in HUES],
+}
+
+
+def run(number: int = 200) -> dict[str, float]:
+    """time each benchmark and return {name: microseconds per color}"""
+    results = {}
+    for name, func in BENCHMARKS.items():
+        size = len(func())
+        best = min(Timer(func).repeat(repeat=5, number=number))
+        results[name] = best / number / size * 1e6
+    return results
+
+
+if __name__ == "__main__":
+    for name, usec in run().items():
+        print(f"{name:<14} {usec:6.3f} us/color")
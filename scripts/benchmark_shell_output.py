@@ -0,0 +1,57 @@
+"""benchmark thonny's shell against a sketch that floods it with output
+open this file in thonny, turn on py5 > Imported mode for py5 and run it:
+it prints LINES_PER_SECOND lines a second, spread over its frames, and
+reports each second how many frames and lines it managed, a print() that
+waits for a busy shell slows both down; compare runs with
+run.py5_output_throttle = False and True in configuration.ini (and
+py5 > Collapse repeated output lines, with REPEAT = True), thonny's
+frontend.log gets the time the shell took per batch when a run ends
+"""
+
+import sys
+import time
+
+LINES_PER_SECOND = 10_000
+FRAME_RATE = 60
+# print the same line every time, to try collapsing repeated lines
+REPEAT = False
+SECONDS = 10
+
+lines_per_frame = LINES_PER_SECOND // FRAME_RATE
+started = second_started = 0.0
+frames = lines = 0
+worst_frame = 0.0
+
+
+def setup():
+    global started, second_started
+    size(300, 200)
+    frame_rate(FRAME_RATE)
+    started = second_started = time.perf_counter()
+
+
+def draw():
+    global second_started, frames, lines, worst_frame
+    frame_started = time.perf_counter()
+    background(frame_count % 256)
+    for i in range(lines_per_frame):
+        if REPEAT:
+            print("the same line, every frame")
+        else:
+            print(f"frame {frame_count} line {i} x={random(1):.4f}")
+    lines += lines_per_frame
+    frames += 1
+    worst_frame = max(worst_frame, time.perf_counter() - frame_started)
+
+    now = time.perf_counter()
+    if now - second_started >= 1:
+        elapsed = now - second_started
+        print(
+            f"[benchmark] {frames / elapsed:.1f} fps (target {FRAME_RATE}), "
+            f"{lines / elapsed:.0f} lines/s (target {LINES_PER_SECOND}), "
+            f"worst frame {worst_frame * 1000:.1f} ms",
+            file=sys.stderr,
+        )
+        second_started, frames, lines, worst_frame = now, 0, 0, 0.0
+    if now - started >= SECONDS:
+        exit_sketch()
@@ -0,0 +1,61 @@
+"""check that importing the thonny-py5mode plug-in stays cheap
+runs `python -X importtime` on the plug-in package (thonny must be installed)
+and fails if it goes over budget or pulls in heavy optional dependencies
+"""
+
+import argparse
+import subprocess
+import sys
+
+PLUGIN = "thonnycontrib.thonny-py5mode"
+# already loaded by the time thonny loads its plug-ins, so not counted here
+PRELOADED = (
+    "thonny",
+    "thonny.editors",
+    "thonny.running",
+    "thonny.shell",
+    "thonny.ui_utils",
+)
+# only needed once the user opens the color selector, installs a jdk, etc.
+DEFERRED = ("PIL", "pyperclip", "jpype", "jdk", "numpy", "py5", "py5_tools")
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """map module name to (self, cumulative) import time in microseconds"""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=150.0)
+    args = parser.parse_args()
+
+    # -X importtime doesn't log a module loaded by importlib.import_module,
+    # __import__ takes the same dotted name and is logged
+    code = f"import {', '.join(PRELOADED)}; __import__({PLUGIN!r})"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        print(result.stderr, file=sys.stderr)
+        return result.returncode
+    times = parse_importtime(result.stderr)
+
+    plugin_ms = times[PLUGIN][1] / 1000
+    print(f"{PLUGIN}: {plugin_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    loaded = sorted(m for m in times if m.split(".")[0] in DEFERRED)
+    for module in loaded:
+        print(f"  imported at load time: {module}")
+    return int(plugin_ms > args.budget_ms or bool(loaded))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
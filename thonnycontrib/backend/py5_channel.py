@@ -0,0 +1,157 @@
+'''side channel between running sketches and thonny's frontend
+   the frontend listens on a local port and, before the backend starts,
+   puts "port:token" in the environment; the backend connects once and
+   both ends exchange small binary frames (a type byte, a 4 byte payload
+   length, the payload) for telemetry, window events and control commands,
+   leaving the sketch's stdout and stderr to its own output
+
+   this module only uses the standard library, the frontend imports it too
+'''
+
+import hmac
+import logging
+import os
+import socket
+import struct
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_ENV = 'PY5MODE_CHANNEL'
+HEADER = struct.Struct('!BI')
+MAX_PAYLOAD = 1 << 16
+
+# backend -> frontend
+HELLO = 1  # the token, ascii
+WINDOW_MOVED = 2  # WINDOW_MOVED_STRUCT
+FRAME_STATS = 3  # FRAME_STATS_STRUCT, then the histogram
+# frontend -> backend
+RELOAD = 16  # the sketch file was saved, no payload
+
+WINDOW_MOVED_STRUCT = struct.Struct('!ii')
+# frame_count, fps, draw_ms, p50_ms, p95_ms, p99_ms, max_ms, dropped, buckets
+FRAME_STATS_STRUCT = struct.Struct('!I6fIB')
+FRAME_STATS_KEYS = ('frame_count', 'fps', 'draw_ms', 'p50_ms', 'p95_ms',
+                    'p99_ms', 'max_ms', 'dropped')
+# seconds between two looks at the sketch window's location
+WINDOW_CHECK_INTERVAL = 0.25
+
+
+def encode_frame(kind: int, payload: bytes = b'') -> bytes:
+    return HEADER.pack(kind, len(payload)) + payload
+
+
+def read_frame(stream) -> tuple[int, bytes] | None:
+    '''next (type, payload) from a binary file-like stream, None at the end'''
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    kind, length = HEADER.unpack(header)
+    if length > MAX_PAYLOAD:
+        raise ValueError(f'py5 channel frame too long ({length} bytes)')
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return kind, payload
+
+
+def encode_frame_stats(stats: dict) -> bytes:
+    bounds, counts = stats['histogram_bounds'], stats['histogram']
+    values = [stats[key] for key in FRAME_STATS_KEYS]
+    return (FRAME_STATS_STRUCT.pack(*values, len(bounds))
+            + struct.pack(f'!{len(bounds)}f{len(counts)}I', *bounds, *counts))
+
+
+def decode_frame_stats(payload: bytes) -> dict:
+    *values, buckets = FRAME_STATS_STRUCT.unpack_from(payload)
+    stats = dict(zip(FRAME_STATS_KEYS, values))
+    histogram = struct.unpack_from(f'!{buckets}f{buckets + 1}I', payload,
+                                   FRAME_STATS_STRUCT.size)
+    stats['histogram_bounds'] = list(histogram[:buckets])
+    stats['histogram'] = list(histogram[buckets:])
+    return stats
+
+
+def check_token(payload: bytes, token: str) -> bool:
+    return hmac.compare_digest(payload, token.encode('ascii'))
+
+
+class ChannelClient:
+    '''the backend's end of the channel, handlers[type](payload) are called
+    from a reader thread'''
+
+    def __init__(self, port: int, token: str):
+        self.handlers: dict[int, Callable[[bytes], None]] = {}
+        self.socket = socket.create_connection(('127.0.0.1', port), timeout=2)
+        self.socket.settimeout(None)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.send_lock = threading.Lock()
+        self.send(HELLO, token.encode('ascii'))
+        threading.Thread(
+          target=self._read, name='py5_channel', daemon=True
+        ).start()
+
+    def send(self, kind: int, payload: bytes = b'') -> bool:
+        '''send a frame, False if the frontend is gone'''
+        try:
+            with self.send_lock:
+                self.socket.sendall(encode_frame(kind, payload))
+            return True
+        except OSError:
+            return False
+
+    def _read(self) -> None:
+        stream = self.socket.makefile('rb')
+        try:
+            while frame := read_frame(stream):
+                kind, payload = frame
+                handler = self.handlers.get(kind)
+                if handler:
+                    handler(payload)
+        except (OSError, ValueError):
+            logger.exception('py5 channel closed')
+
+
+_client = None
+
+
+def get_channel() -> ChannelClient | None:
+    '''connect to the frontend on first use, None if it didn't offer a
+    channel or can't be reached'''
+    global _client
+    if _client is None and os.environ.get(CHANNEL_ENV):
+        port, token = os.environ.pop(CHANNEL_ENV).split(':')
+        try:
+            _client = ChannelClient(int(port), token)
+        except OSError:
+            logger.exception('py5 channel not available')
+    return _client
+
+
+def start_window_tracking(get_location: Callable[[], tuple[int, int] | None],
+                          channel: ChannelClient) -> threading.Event:
+    '''report where the sketch window is after it moves, so the next run
+    can open it there; get_location() is polled from a thread, not from a
+    draw() hook, as static and no_loop() sketches don't call draw() again
+
+    set the event returned to stop
+    '''
+    stop = threading.Event()
+
+    def track() -> None:
+        last_location = None
+        while not stop.wait(WINDOW_CHECK_INTERVAL):
+            try:
+                location = get_location()
+            except Exception:
+                logger.exception('py5 window location not available')
+                return
+            if location is not None and location != last_location:
+                last_location = location
+                channel.send(WINDOW_MOVED, WINDOW_MOVED_STRUCT.pack(*location))
+
+    threading.Thread(
+      target=track, name='py5_window_tracking', daemon=True
+    ).start()
+    return stop
@@ -0,0 +1,224 @@
+'''static index of py5's imported mode names for autocompletion
+   built from py5_tools' reference (the names) and py5's sources (signatures,
+   docstrings), without importing py5 (which would start the jvm), and
+   cached as json in thonny's user directory per py5 version
+'''
+
+import ast
+import bisect
+import inspect
+import json
+import logging
+import pathlib
+from importlib import machinery, metadata, util
+from thonny import THONNY_USER_DIR
+from thonny.common import CompletionInfo, SignatureInfo, SignatureParameter
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = pathlib.Path(THONNY_USER_DIR) / 'py5mode_completions.json'
+CACHE_FORMAT = 1
+# METHOD_SIGNATURES_LOOKUP classes whose methods are imported mode functions
+FUNCTION_CLASSES = ('Sketch', 'Py5Functions', 'Py5Tools')
+PARAMETER_KINDS = {
+  'posonlyargs': inspect.Parameter.POSITIONAL_ONLY,
+  'args': inspect.Parameter.POSITIONAL_OR_KEYWORD,
+  'vararg': inspect.Parameter.VAR_POSITIONAL,
+  'kwonlyargs': inspect.Parameter.KEYWORD_ONLY,
+  'kwarg': inspect.Parameter.VAR_KEYWORD,
+}
+
+
+def get_py5_dir() -> pathlib.Path:
+    '''return the py5 package directory (find_spec doesn't import py5)'''
+    spec = util.find_spec('py5')
+    return pathlib.Path(spec.submodule_search_locations[0])
+
+
+def load_method_signatures(py5_dir: pathlib.Path) -> dict:
+    '''read py5's METHOD_SIGNATURES_LOOKUP, {(class, method): [signature]}'''
+    path = py5_dir / 'reference.py'
+    loader = machinery.SourceFileLoader('py5_reference', str(path))
+    module = util.module_from_spec(util.spec_from_loader(loader.name, loader))
+    loader.exec_module(module)
+    return module.METHOD_SIGNATURES_LOOKUP
+
+
+def read_docstrings(py5_dir: pathlib.Path) -> dict[str, tuple[str, str]]:
+    '''return {name: (type, docstring)} for py5's top level definitions'''
+    found = {}
+    # __init__.py first, it holds the imported mode functions
+    paths = sorted(py5_dir.glob('*.py'), key=lambda p: p.name != '__init__.py')
+    for path in paths:
+        tree = ast.parse(path.read_text(encoding='utf-8'))
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef):
+                kind = 'function'
+            elif isinstance(node, ast.ClassDef):
+                kind = 'class'
+            else:
+                continue
+            docstring = ast.get_docstring(node)
+            # overloads repeat the name, keep the first documented one
+            if docstring and node.name not in found:
+                found[node.name] = (kind, docstring)
+    return found
+
+
+def get_name_type(name: str, docstrings: dict,
+                  dynamic_variables: list[str]) -> str:
+    '''jedi-like completion type of a py5 name'''
+    if name in docstrings:
+        return docstrings[name][0]
+    if name in dynamic_variables or name.isupper():
+        return 'statement'
+    return 'instance'
+
+
+def build_entries() -> list[dict]:
+    '''collect name, type, signatures and docstring of every py5 name'''
+    from py5_tools.reference import PY5_DIR_STR, PY5_DYNAMIC_VARIABLES
+
+    py5_dir = get_py5_dir()
+    signatures = load_method_signatures(py5_dir)
+    docstrings = read_docstrings(py5_dir)
+    entries = []
+    for name in PY5_DIR_STR:
+        if name.startswith('_'):
+            continue
+        for class_name in FUNCTION_CLASSES:
+            name_signatures = signatures.get((class_name, name))
+            if name_signatures:
+                break
+        entries.append({
+          'name': name,
+          'type': get_name_type(name, docstrings, PY5_DYNAMIC_VARIABLES),
+          'signatures': name_signatures or [],
+          'docstring': docstrings.get(name, (None, ''))[1],
+        })
+    return sorted(entries, key=lambda entry: entry['name'].lower())
+
+
+def get_cache_key() -> dict:
+    try:
+        version = metadata.version('py5')
+    except metadata.PackageNotFoundError:
+        version = ''
+    return {'format': CACHE_FORMAT, 'py5': version}
+
+
+def load_entries() -> list[dict]:
+    '''return the cached index entries, rebuilding them for a new py5'''
+    key = get_cache_key()
+    try:
+        cache = json.loads(CACHE_PATH.read_text(encoding='utf-8'))
+        if cache['key'] == key:
+            return cache['entries']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    entries = build_entries()
+    try:
+        CACHE_PATH.write_text(
+          json.dumps({'key': key, 'entries': entries}), encoding='utf-8'
+        )
+    except OSError:
+        pass  # a read-only user dir only costs rebuilding next session
+    return entries
+
+
+def parse_signature(name: str, signature: str) -> SignatureInfo:
+    '''turn '(x: float, /) -> None' into thonny's SignatureInfo'''
+    function = ast.parse(f'def {name}{signature}: pass').body[0]
+    arguments = function.args
+    params = []
+    defaults = [None] * (len(arguments.posonlyargs) + len(arguments.args)
+                         - len(arguments.defaults)) + arguments.defaults
+    positional = arguments.posonlyargs + arguments.args
+    for group, kind in PARAMETER_KINDS.items():
+        group_args = getattr(arguments, group)
+        if group_args is None:
+            continue
+        if not isinstance(group_args, list):
+            group_args = [group_args]
+        for arg in group_args:
+            if arg in positional:
+                default = defaults[positional.index(arg)]
+            elif group == 'kwonlyargs':
+                default = arguments.kw_defaults[group_args.index(arg)]
+            else:
+                default = None
+            params.append(SignatureParameter(
+              kind=str(kind),
+              name=arg.arg,
+              annotation=arg.annotation and ast.unparse(arg.annotation),
+              default=default and ast.unparse(default),
+            ))
+    return SignatureInfo(
+      name=name,
+      params=params,
+      return_type=function.returns and ast.unparse(function.returns),
+    )
+
+
+class Py5CompletionIndex:
+    '''case-insensitive prefix lookup of py5 names in a sorted array'''
+
+    def __init__(self, entries: list[dict]):
+        self.entries = entries
+        self.keys = [entry['name'].lower() for entry in entries]
+        self.names = {entry['name'] for entry in entries}
+        self.module_path = str(get_py5_dir() / '__init__.py')
+        self._by_full_name = {'py5.' + e['name']: e for e in entries}
+
+    def match(self, word: str) -> list[CompletionInfo]:
+        '''completions for the py5 names starting with word'''
+        word = word.lower()
+        start = bisect.bisect_left(self.keys, word)
+        end = bisect.bisect_left(self.keys, word + '\uffff', start)
+        return [self.to_completion(entry, len(word))
+                for entry in self.entries[start:end]]
+
+    def to_completion(self, entry: dict, prefix_length: int,
+                      details: bool = False) -> CompletionInfo:
+        name = entry['name']
+        name_with_symbols = name
+        if entry['type'] == 'function':
+            # like thonny: close the bracket if there is nothing to pass
+            no_params = entry['signatures'] and all(
+              signature.startswith('()') for signature in entry['signatures']
+            )
+            name_with_symbols += '()' if no_params else '('
+        signatures = docstring = None
+        if details:
+            signatures = [parse_signature(name, signature)
+                          for signature in entry['signatures']]
+            docstring = entry['docstring']
+        return CompletionInfo(
+          name=name,
+          name_with_symbols=name_with_symbols,
+          full_name='py5.' + name,
+          type=entry['type'],
+          prefix_length=prefix_length,
+          signatures=signatures,
+          docstring=docstring,
+          module_name='py5',
+          module_path=self.module_path,
+        )
+
+    def get_details(self, full_name: str) -> CompletionInfo | None:
+        '''signatures and docstring of an indexed name, if it is one'''
+        entry = self._by_full_name.get(full_name)
+        if entry is None:
+            return None
+        return self.to_completion(entry, 0, details=True)
+
+
+_index = None
+
+
+def get_completion_index() -> Py5CompletionIndex:
+    '''load the index on first use'''
+    global _index
+    if _index is None:
+        _index = Py5CompletionIndex(load_entries())
+    return _index
@@ -0,0 +1,160 @@
+'''py5 autocompletion for imported mode
+   py5 names are answered from a static index (py5_completion_index.py),
+   jedi only runs for attribute access and for names the user's buffer,
+   python's builtins or keywords could complete
+'''
+
+import builtins
+import collections
+import keyword
+import logging
+import re
+import time
+from thonny.common import CompletionInfo
+from thonnycontrib.backend.py5_completion_index import get_completion_index
+
+logger = logging.getLogger(__name__)
+
+PY5_PREFIX = 'from py5 import *\n'
+# identifier being typed at the end of the line
+WORD_REGEX = re.compile(r'[^\W\d]\w*$|$')
+# comments and (possibly unterminated) strings
+SKIP_REGEX = re.compile(
+  r'''\#.*|[rRbBuUfF]{0,2}(\'\'\'|"""|'|")(?:\\.|(?!\1).)*(\1)?'''
+)
+PYTHON_NAMES = sorted(set(dir(builtins)) | set(keyword.kwlist))
+# latencies kept for the stats, per kind of completion
+LATENCY_SAMPLES = 1000
+
+
+def get_word_context(line: str) -> tuple[str, bool]:
+    '''return the name being typed and whether it is an attribute (x.name)'''
+    word = WORD_REGEX.search(line).group()
+    before = line[:len(line) - len(word)].rstrip()
+    return word, before.endswith('.')
+
+
+def is_in_code(line: str) -> bool:
+    '''False when the end of the line is inside a comment or a string'''
+    for match in SKIP_REGEX.finditer(line):
+        if match.end() == len(line):
+            is_comment = match.group().startswith('#')
+            return not (is_comment or match.group(2) is None)
+    return True
+
+
+def get_offset(source: str, row: int, column: int) -> int:
+    '''character offset of row (1-based) and column in source'''
+    lines = source.splitlines(keepends=True)
+    return sum(len(line) for line in lines[:row - 1]) + column
+
+
+def sort_key(completion: CompletionInfo) -> tuple:
+    '''same order as jedi: public names first, then case-insensitive'''
+    return completion.name.startswith('_'), completion.name.lower()
+
+
+class Py5Completer:
+    '''completes py5 names from the index and everything else with jedi'''
+
+    def __init__(self, sys_path: list[str]):
+        self.sys_path = sys_path
+        self.latencies = {
+          kind: collections.deque(maxlen=LATENCY_SAMPLES)
+          for kind in ('index', 'merged', 'jedi', 'attribute')
+        }
+
+    def has_other_matches(self, source: str, offset: int, word: str) -> bool:
+        '''whether something besides py5 may complete word: a name in the
+        buffer (other than the one being typed), a builtin or a keyword'''
+        lower = word.lower()
+        if any(name.lower().startswith(lower) for name in PYTHON_NAMES):
+            return True
+        py5_names = get_completion_index().names
+        pattern = r'(?<![\w.])' + re.escape(word) + r'\w*'
+        for match in re.finditer(pattern, source, re.IGNORECASE):
+            if match.group() not in py5_names and match.end() != offset:
+                return True
+        return False
+
+    def get_kind(self, source: str, row: int, column: int) -> tuple[str, str]:
+        '''decide how to complete the word at row and column of source,
+        returns the kind of completion (a key of latencies) and the word'''
+        lines = source.splitlines() or ['']
+        line = lines[row - 1][:column] if row <= len(lines) else ''
+        word, is_attribute = get_word_context(line)
+        if is_attribute:
+            return 'attribute', word
+        if not is_in_code(line):
+            return 'jedi', word
+        if word and not self.has_other_matches(
+              source, get_offset(source, row, column), word):
+            return 'index', word
+        return 'merged', word
+
+    def complete(self, source: str, row: int, column: int,
+                 filename: str) -> list[CompletionInfo]:
+        '''completions for the word at row and column of source'''
+        started = time.perf_counter()
+        kind, word = self.get_kind(source, row, column)
+        if kind == 'index':
+            completions = get_completion_index().match(word)
+        else:
+            completions = self.complete_with_jedi(
+              kind, word, source, row, column, filename
+            )
+
+        elapsed = (time.perf_counter() - started) * 1000
+        self.latencies[kind].append(elapsed)
+        logger.info('py5 %s completion of %r: %d names in %.2f ms',
+                    kind, word, len(completions), elapsed)
+        return completions
+
+    def complete_with_jedi(self, kind: str, word: str, source: str, row: int,
+                           column: int, filename: str) -> list[CompletionInfo]:
+        # jedi takes a while to import, thonny also defers it
+        from thonny import jedi_utils
+
+        if kind == 'attribute':
+            # py5 objects (e.g. a Py5Image) need the star import to be
+            # inferred, so attribute access pays for a full inference
+            source, row = PY5_PREFIX + source, row + 1
+        completions = jedi_utils.get_script_completions(
+          source, row, column, filename, sys_path=self.sys_path
+        )
+        if kind == 'merged':
+            return self.merge(completions, word)
+        return completions
+
+    def merge(self, completions: list[CompletionInfo],
+              word: str) -> list[CompletionInfo]:
+        '''add py5 names the user's buffer doesn't define itself'''
+        names = {c.name for c in completions}
+        extra = [c for c in get_completion_index().match(word)
+                 if c.name not in names]
+        return sorted(completions + extra, key=sort_key)
+
+    def get_details(self, full_name: str) -> CompletionInfo | None:
+        '''signatures and docstring of a completion, from wherever it came'''
+        from thonny import jedi_utils
+
+        details = get_completion_index().get_details(full_name)
+        if details is None:
+            details = jedi_utils.get_completion_details(full_name)
+        return details
+
+    def stats(self) -> dict:
+        '''number and median latency (ms) of each kind of completion'''
+        result = {}
+        for kind, latencies in self.latencies.items():
+            ordered = sorted(latencies)
+            median = ordered[len(ordered) // 2] if ordered else None
+            result[kind] = {'count': len(ordered), 'median_ms': median}
+        return result
+
+    def log_stats(self) -> None:
+        for kind, stats in self.stats().items():
+            if stats['count']:
+                logger.info('py5 %s completions: %d, median %.2f ms',
+                            kind, stats['count'], stats['median_ms'])
+
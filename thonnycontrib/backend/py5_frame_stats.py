@@ -0,0 +1,97 @@
+'''frame timing of running sketches, for the frontend's py5 frame timing view
+   draw() is timed by a pre and a post hook, and the numbers are aggregated
+   here, in the sketch process, then sent a few times per second as one
+   small backend event, measuring costs two clock reads per frame
+'''
+
+import bisect
+import collections
+import logging
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPE = 'Py5FrameStats'
+HOOK_NAME = 'thonny_py5mode_frame_stats'
+# seconds between two events sent to the frontend
+SEND_INTERVAL = 0.25
+# percentiles and histogram are of the last frames, about 4 s at 60 fps
+ROLLING_FRAMES = 240
+# upper bounds (ms) of the draw time histogram buckets, the last one is open
+HISTOGRAM_BOUNDS = (2, 4, 8, 16, 33, 66)
+# a frame interval this many times the usual one means frames were dropped
+DROPPED_FACTOR = 1.5
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class FrameStats:
+    '''pre and post draw hooks, passing send() a summary dict of the
+    sketch's timing every SEND_INTERVAL seconds'''
+
+    def __init__(self, send: Callable[[dict], None]):
+        self.send = send
+        self.draw_times = collections.deque(maxlen=ROLLING_FRAMES)
+        self.intervals = collections.deque(maxlen=ROLLING_FRAMES)
+        self.usual_interval = None  # median of intervals, as of the last send
+        self.started = None  # when the draw() being timed started
+        self.window_started = None
+        self.window_frames = 0
+        self.dropped = 0
+
+    def pre_draw(self, sketch) -> None:
+        now = time.perf_counter()
+        if self.started is None:
+            self.window_started = now
+        else:
+            interval = now - self.started
+            usual = self.usual_interval
+            if usual and interval > usual * DROPPED_FACTOR:
+                self.dropped += round(interval / usual) - 1
+            self.intervals.append(interval)
+        self.started = now
+
+    def post_draw(self, sketch) -> None:
+        now = time.perf_counter()
+        self.draw_times.append(now - self.started)
+        self.window_frames += 1
+        if now - self.window_started >= SEND_INTERVAL:
+            try:
+                self.send(self.summarize(sketch, now))
+            except Exception:
+                # hook exceptions would stop the sketch
+                logger.exception('py5 frame stats not sent')
+            self.window_started = now
+            self.window_frames = 0
+
+    def summarize(self, sketch, now: float) -> dict:
+        intervals = sorted(self.intervals)
+        if intervals:
+            self.usual_interval = intervals[len(intervals) // 2]
+        draw_ms = sorted(seconds * 1000 for seconds in self.draw_times)
+        histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        for milliseconds in draw_ms:
+            histogram[bisect.bisect_left(HISTOGRAM_BOUNDS, milliseconds)] += 1
+        recent = list(self.draw_times)[-self.window_frames:]
+        return dict(
+          frame_count=sketch.frame_count,
+          fps=self.window_frames / (now - self.window_started),
+          draw_ms=sum(recent) * 1000 / len(recent),
+          p50_ms=percentile(draw_ms, 0.5),
+          p95_ms=percentile(draw_ms, 0.95),
+          p99_ms=percentile(draw_ms, 0.99),
+          max_ms=draw_ms[-1],
+          histogram=histogram,
+          histogram_bounds=HISTOGRAM_BOUNDS,
+          dropped=self.dropped,
+        )
+
+
+def install_frame_stats(sketch, send: Callable[[dict], None]) -> None:
+    '''time sketch's draw() while it runs'''
+    stats = FrameStats(send)
+    sketch._add_pre_hook('draw', HOOK_NAME, stats.pre_draw)
+    sketch._add_post_hook('draw', HOOK_NAME, stats.post_draw)
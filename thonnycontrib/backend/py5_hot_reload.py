@@ -0,0 +1,177 @@
+'''hot reload for imported mode sketches
+   while a sketch runs, saving its file swaps in the new code of its
+   functions (draw, event functions, helpers) between two frames, so the
+   sketch keeps its state; module level code, settings() and setup() are
+   not run again, changing those still needs a new run
+'''
+
+import ast
+import pathlib
+import sys
+import time
+import traceback
+import types
+from py5_tools import parsing
+
+HOOK_NAME = 'thonny_py5mode_hot_reload'
+# seconds between two looks at the sketch file's modification time
+CHECK_INTERVAL = 0.25
+# functions py5 only calls at the start of a run
+RUN_ONCE = ('settings', 'setup')
+
+
+def read_functions(source: str,
+                   path: pathlib.Path) -> dict[str, ast.FunctionDef]:
+    '''top level function definitions of source, by name (last one wins)'''
+    tree = ast.parse(source, filename=str(path))
+    return {node.name: node for node in tree.body
+            if isinstance(node, ast.FunctionDef)}
+
+
+def get_function_dumps(
+      functions: dict[str, ast.FunctionDef]) -> dict[str, str]:
+    '''what functions do, ignoring where they are in the file'''
+    return {name: ast.dump(node) for name, node in functions.items()}
+
+
+class HotReloader:
+    '''pre-draw hook swapping in the sketch's changed functions once its
+    file is saved, the check costs a clock read on most frames'''
+
+    def __init__(self, sketch_path: pathlib.Path):
+        self.sketch_path = sketch_path
+        self.mtime = self.get_mtime()
+        source = sketch_path.read_text(encoding='utf-8')
+        # the functions the sketch is running
+        self.dumps = get_function_dumps(read_functions(source, sketch_path))
+        self.next_check = time.monotonic() + CHECK_INTERVAL
+
+    def check_now(self) -> None:
+        '''look at the file on the next frame, the frontend saw it saved'''
+        self.next_check = 0.0
+
+    def get_mtime(self) -> int:
+        try:
+            return self.sketch_path.stat().st_mtime_ns
+        except OSError:  # being saved, or renamed
+            return self.mtime
+
+    def __call__(self, sketch) -> None:
+        now = time.monotonic()
+        if now < self.next_check:
+            return
+        self.next_check = now + CHECK_INTERVAL
+        mtime = self.get_mtime()
+        if mtime == self.mtime:
+            return
+        self.mtime = mtime
+
+        started = time.perf_counter()
+        try:
+            # _py5_bridge is not a public api
+            reloaded = self.reload(sketch._py5_bridge)
+        except Exception:
+            # keep the running code, a later save may fix it
+            print('py5 hot reload failed, the sketch keeps its previous code',
+                  file=sys.stderr)
+            error = traceback.format_exception_only(*sys.exc_info()[:2])
+            print(''.join(error), end='', file=sys.stderr)
+            return
+        if reloaded:
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f'py5 hot reload: {", ".join(reloaded)} ({elapsed:.1f} ms)',
+                  file=sys.stderr)
+
+    def reload(self, bridge) -> list[str]:
+        '''swap in the changed functions, returns their names'''
+        source = self.sketch_path.read_text(encoding='utf-8')
+        functions = read_functions(source, self.sketch_path)
+        dumps = get_function_dumps(functions)
+        changed = [name for name in functions
+                   if dumps[name] != self.dumps.get(name)]
+        problems = parsing.check_reserved_words(
+          source, ast.parse(source, filename=str(self.sketch_path))
+        )
+        if problems:
+            raise SyntaxError('\n'.join(problems))
+
+        reloadable = []
+        for name in changed:
+            if name in RUN_ONCE:
+                self.warn(f'{name}() changed, run the sketch again to use it')
+            elif functions[name].decorator_list:
+                self.warn(f'{name}() is decorated, run the sketch again to '
+                          f'use its new version')
+            else:
+                reloadable.append(name)
+                continue
+            dumps[name] = self.dumps.get(name)  # still the running version
+
+        # line numbers of unchanged functions may have moved too
+        nodes = [node for name, node in functions.items()
+                 if name not in RUN_ONCE and not node.decorator_list]
+        code = compile(
+          parsing.transform_py5_code(ast.Module(body=nodes, type_ignores=[])),
+          filename=str(self.sketch_path),
+          mode='exec',
+        )
+        namespace = bridge._caller_globals
+        # definitions are made elsewhere, only their code gets swapped in
+        scratch = dict(namespace)
+        exec(code, scratch)
+
+        reloaded = []
+        for node in nodes:
+            name = node.name
+            if self.swap(bridge, namespace, name, scratch[name]):
+                if name in reloadable:
+                    reloaded.append(name)
+            else:
+                dumps[name] = self.dumps.get(name)
+        self.dumps = dumps
+        return reloaded
+
+    def swap(self, bridge, namespace: dict, name: str,
+             new: types.FunctionType) -> bool:
+        '''give the running function new's code, False if it can't'''
+        from py5 import reference
+
+        old = namespace.get(name)
+        if not isinstance(old, types.FunctionType):
+            if name in reference.METHODS and not bridge.has_function(name):
+                self.warn(f'{name}() is new, run the sketch again to use it')
+                return False
+            namespace[name] = types.FunctionType(
+              new.__code__, namespace, name, new.__defaults__
+            )
+            namespace[name].__kwdefaults__ = new.__kwdefaults__
+            return True
+
+        # py5 passes event functions the arguments it counted at the start
+        count = bridge._function_param_counts.get(name)
+        if count is not None and new.__code__.co_argcount != count:
+            self.warn(f'{name}() takes other parameters now, run the sketch '
+                      f'again to use it')
+            return False
+        if old.__code__.co_freevars != new.__code__.co_freevars:
+            return False
+        old.__code__ = new.__code__
+        old.__defaults__ = new.__defaults__
+        old.__kwdefaults__ = new.__kwdefaults__
+        old.__doc__ = new.__doc__
+        return True
+
+    @staticmethod
+    def warn(message: str) -> None:
+        print(f'py5 hot reload: {message}', file=sys.stderr)
+
+
+def install_hot_reload(sketch,
+                       sketch_path: pathlib.Path) -> HotReloader | None:
+    '''reload sketch_path's functions into sketch while it runs'''
+    try:
+        reloader = HotReloader(sketch_path)
+    except (OSError, SyntaxError, ValueError):
+        return None  # py5 reports what is wrong with the sketch itself
+    sketch._add_pre_hook('draw', HOOK_NAME, reloader)
+    return reloader
@@ -2,15 +2,24 @@
    interacts with thonny-py5mode frontend (thonny-py5mode > __init__.py)
 '''
 
+import argparse
 import ast
+import atexit
+import functools
 import os
 import pathlib
 import sys
-from py5_tools import imported
+import time
+from py5_tools import imported, jvm
 from thonny import get_version
-from thonny.common import InlineCommand, InlineResponse
+from thonny.common import (
+  BackendEvent,
+  InlineCommand,
+  InlineResponse,
+  ToplevelCommand,
+  UserError
+)
 try:  # thonny 4 package layout
-    from thonny import jedi_utils
     from thonny.plugins.cpython_backend import (
       get_backend,
       MainCPythonBackend
@@ -24,15 +33,47 @@ except ImportError:  # thonny 3 package layout
       get_backend,
       MainCPythonBackend
     )
+if int(get_version()[0]) >= 4:
+    # the plug-in's modules, outside the try above so that an error in one
+    # of them isn't taken for thonny 3's package layout
+    from thonnycontrib.backend.py5_completions import Py5Completer
+    from thonnycontrib.backend.py5_channel import (
+      FRAME_STATS,
+      RELOAD,
+      encode_frame_stats,
+      get_channel,
+      start_window_tracking
+    )
+    from thonnycontrib.backend.py5_frame_stats import (
+      EVENT_TYPE as FRAME_STATS_EVENT,
+      install_frame_stats
+    )
+    from thonnycontrib.backend.py5_hot_reload import install_hot_reload
+    from thonnycontrib.backend.py5_memory import (
+      EVENT_TYPE as MEMORY_EVENT,
+      SketchMemoryTracker
+    )
+    from thonnycontrib.backend.py5_profiler import (
+      EVENT_TYPE as PROFILE_EVENT,
+      SketchProfiler
+    )
+
+# created on the first completion request of this backend session
+completer = None
+
+
+def get_completer() -> 'Py5Completer':
+    global completer
+    if completer is None:
+        completer = Py5Completer([get_sys_path_directory_containg_plugins()])
+        # the latencies end up in the backend's log when it exits
+        atexit.register(completer.log_stats)
+    return completer
 
 
 def patched_editor_autocomplete(
       self: MainCPythonBackend, cmd: InlineCommand) -> InlineResponse:
     '''add py5 to autocompletion'''
-    prefix = 'from py5 import *\n'
-    cmd['source'] = prefix + cmd['source']
-    cmd['row'] += 1
-
     if int(get_version()[0]) >= 4:  # thonny 4 package layout
         result = dict(
           source=cmd.source,
@@ -40,17 +81,276 @@ def patched_editor_autocomplete(
           column=cmd.column,
           filename=cmd.filename,
         )
-        result['completions'] = jedi_utils.get_script_completions(
-          **result, sys_path=[get_sys_path_directory_containg_plugins()]
-        )
-    else:
-        result = get_backend()._original_editor_autocomplete(cmd)
+        result['completions'] = get_completer().complete(**result)
+        return result
 
+    prefix = 'from py5 import *\n'
+    cmd['source'] = prefix + cmd['source']
+    cmd['row'] += 1
+    result = get_backend()._original_editor_autocomplete(cmd)
     result['row'] -= 1
     result['source'] = result['source'][len(prefix):]
     return result
 
 
+def patched_get_completion_details(
+      self: MainCPythonBackend, cmd: InlineCommand) -> InlineResponse:
+    '''details of py5 names come from the completion index, not jedi'''
+    return InlineResponse(
+      'get_completion_details',
+      full_name=cmd.full_name,
+      details=get_completer().get_details(cmd.full_name),
+    )
+
+
+class MagicArgumentParser(argparse.ArgumentParser):
+    '''argparse exits on bad arguments, which would end the backend, a
+    UserError is shown in the shell instead'''
+
+    def error(self, message: str) -> None:
+        raise UserError(f'{self.prog}: {message}')
+
+
+def return_sketch_result(handler):
+    '''report the sketch's errors as thonny does for %Run, without letting
+    them reach thonny's command loop, which exits the backend (and the jvm
+    the warm runner keeps alive) on any exception but a UserError'''
+
+    @functools.wraps(handler)
+    def wrapper(cmd: ToplevelCommand) -> dict:
+        try:
+            return handler(cmd)
+        except UserError:
+            raise
+        except SystemExit as e:
+            # exit() ends the sketch, not the backend
+            if e.code is not None and not isinstance(e.code, int):
+                print(e.code, file=sys.stderr)
+            return {}
+        except (Exception, KeyboardInterrupt):
+            # _prepare_user_exception is not a public api
+            return {'user_exception': get_backend()._prepare_user_exception()}
+
+    return wrapper
+
+
+# arguments of the warm runner magic command, mirroring py5_tools run_sketch.py
+warm_run_parser = MagicArgumentParser(prog='%py5run', add_help=False)
+warm_run_parser.add_argument('sketch_path')
+warm_run_parser.add_argument('--py5_options', nargs='*', default=None)
+warm_run_parser.add_argument('--sketch_args', nargs='*', default=None)
+
+
+def prepare_warm_py5(sketch_path: pathlib.Path, classpath: str = None) -> bool:
+    '''import py5 in imported mode, reusing the jvm if it is already up
+
+    returns True if the jvm was already running (a warm start)
+    '''
+    warm = jvm.is_jvm_running()
+    if not warm:
+        # run_code skips this once the jvm is up, so do it before importing
+        if classpath:
+            jvm.add_classpath(classpath)
+        jvm.add_jars(sketch_path.parent / 'jars')
+    imported.set_imported_mode(True)
+    import py5
+
+    if py5.get_current_sketch().is_dead:
+        # replace the exited sketch and relink mouse_x, frame_count, etc.
+        # to the new one; _prepare_dynamic_variables is not a public api
+        py5.reset_py5()
+        py5._prepare_dynamic_variables(vars(py5), vars(py5))
+    return warm
+
+
+def report_first_frame(started: float, warm: bool) -> None:
+    '''print the time it took for the sketch to reach its first frame'''
+    import py5
+
+    def first_frame_hook(sketch) -> None:
+        for method_name in ('setup', 'draw'):
+            sketch._remove_post_hook(method_name, 'thonny_py5mode_first_frame')
+        elapsed = time.perf_counter() - started
+        start_kind = 'warm' if warm else 'cold'
+        print(f'py5 first frame after {elapsed:.2f} s ({start_kind} start)',
+              file=sys.stderr)
+
+    # sketches without draw() only ever run setup(), so hook both
+    sketch = py5.get_current_sketch()
+    for method_name in ('setup', 'draw'):
+        sketch._add_post_hook(
+          method_name, 'thonny_py5mode_first_frame', first_frame_hook
+        )
+
+
+@return_sketch_result
+def cmd_py5run(cmd: ToplevelCommand) -> dict:
+    '''run a sketch inside this long-lived backend process
+
+    lowercase magic commands don't make thonny restart the backend, so the
+    jvm and py5 stay loaded and only the sketch source is executed again
+    (in a fresh namespace, courtesy of py5_tools run_code)
+    '''
+    started = time.perf_counter()
+    args = warm_run_parser.parse_args(cmd.args)
+    sketch_path = pathlib.Path(args.sketch_path)
+    warm = prepare_warm_py5(sketch_path)
+
+    if os.environ.get('PY5_REPORT_STARTUP', 'False').lower() != 'false':
+        report_first_frame(started, warm)
+
+    imported.run_code(
+      sketch_path,
+      py5_options=args.py5_options,
+      sketch_args=args.sketch_args,
+    )
+    return {}
+
+
+# arguments of the profiling magic command, the sketch's and the profile's
+profile_parser = MagicArgumentParser(
+  prog='%Py5profile', parents=[warm_run_parser], add_help=False
+)
+profile_parser.add_argument('--frames', type=int, default=None)
+profile_parser.add_argument('--seconds', type=float, default=None)
+
+
+def send_profile(results: dict) -> None:
+    get_backend().send_message(BackendEvent(PROFILE_EVENT, **results))
+
+
+@return_sketch_result
+def cmd_py5profile(cmd: ToplevelCommand) -> dict:
+    '''run a sketch with cProfile on during setup() and its first frames
+
+    the capitalized name makes thonny start a fresh backend for it, as for
+    %Run, so the profile doesn't include a previous run's leftovers
+    '''
+    args = profile_parser.parse_args(cmd.args)
+    sketch_path = pathlib.Path(args.sketch_path)
+    prepare_warm_py5(sketch_path)
+    import py5
+
+    profiler = SketchProfiler(
+      str(sketch_path), args.frames, args.seconds, send_profile
+    )
+    sketch = py5.get_current_sketch()
+    profiler.install(sketch)
+    try:
+        imported.run_code(
+          sketch_path,
+          py5_options=args.py5_options,
+          sketch_args=args.sketch_args,
+        )
+    finally:
+        # run_code blocks until the sketch ends, maybe before the profile
+        if not profiler.done:
+            profiler.finish(sketch, ended=True)
+    return {}
+
+
+# arguments of the memory tracking magic command, the sketch's
+memory_parser = MagicArgumentParser(
+  prog='%Py5memory', parents=[warm_run_parser], add_help=False
+)
+
+
+def send_memory_report(report: dict) -> None:
+    get_backend().send_message(BackendEvent(MEMORY_EVENT, **report))
+
+
+@return_sketch_result
+def cmd_py5memory(cmd: ToplevelCommand) -> dict:
+    '''run a sketch with tracemalloc on, reporting its allocations per frame
+
+    capitalized like %Py5profile, so the sketch gets a fresh backend
+    '''
+    args = memory_parser.parse_args(cmd.args)
+    sketch_path = pathlib.Path(args.sketch_path)
+    prepare_warm_py5(sketch_path)
+    import py5
+
+    tracker = SketchMemoryTracker(str(sketch_path), send_memory_report)
+    tracker.install(py5.get_current_sketch())
+    try:
+        imported.run_code(
+          sketch_path,
+          py5_options=args.py5_options,
+          sketch_args=args.sketch_args,
+        )
+    finally:
+        # run_code blocks until the sketch ends, the shell doesn't need tracing
+        tracker.uninstall()
+    return {}
+
+
+def send_frame_stats(stats: dict) -> None:
+    '''pass the sketch's frame timing to the frontend's frame timing view,
+    through the side channel if there is one'''
+    channel = get_channel()
+    if channel is None or not channel.send(
+          FRAME_STATS, encode_frame_stats(stats)):
+        get_backend().send_message(BackendEvent(FRAME_STATS_EVENT, **stats))
+
+
+def get_window_location(sketch) -> tuple[int, int] | None:
+    '''the sketch window's location, as processing reports it on a move
+
+    window_x and window_y are only updated while the sketch draws, so the
+    location is read from the window itself (the awt frame around java2d's
+    canvas, or the opengl renderers' newt window)
+    '''
+    if not sketch.is_running:
+        return None
+    from jpype import JClass
+
+    # _instance is not a public api
+    window = sketch._instance.getSurface().getNative()
+    if isinstance(window, JClass('java.awt.Component')):
+        swing_utilities = JClass('javax.swing.SwingUtilities')
+        window = swing_utilities.getWindowAncestor(window)
+        if window is None:
+            return None
+    return int(window.getX()), int(window.getY())
+
+
+def patched_run_code(sketch_path, *args, **kwargs) -> None:
+    '''hook frame timing and hot reload into the sketch run_sketch.py or
+    %py5run is about to run, the jvm and py5 start here, not in run_code'''
+    sketch_path = pathlib.Path(sketch_path)
+    window_tracking = None
+    if sketch_path.exists() and not kwargs.get('new_process'):
+        prepare_warm_py5(sketch_path, kwargs.get('classpath'))
+        import py5
+
+        sketch, channel = py5.get_current_sketch(), get_channel()
+        reloader = None
+        if os.environ.get('PY5_HOT_RELOAD', 'False').lower() != 'false':
+            reloader = install_hot_reload(sketch, sketch_path)
+        install_frame_stats(sketch, send_frame_stats)
+        if channel is not None:
+            # the window's moves go there, not to stderr (external mode)
+            window_tracking = start_window_tracking(
+              lambda: get_window_location(sketch), channel
+            )
+            # the frontend says when the sketch is saved
+            channel.handlers.pop(RELOAD, None)  # a previous warm run's
+            if reloader is not None:
+                channel.handlers[RELOAD] = lambda payload: reloader.check_now()
+        else:
+            # no channel, have processing report the window's moves on
+            # stderr (the frontend leaves that switch out if it offered one)
+            py5_options = kwargs.get('py5_options') or []
+            if 'external' not in py5_options:
+                kwargs['py5_options'] = ['external', *py5_options]
+    try:
+        return imported._original_run_code(sketch_path, *args, **kwargs)
+    finally:
+        # run_code blocks until the sketch ends
+        if window_tracking is not None:
+            window_tracking.set()
+
+
 def load_plugin() -> None:
     '''every thonny plug-in uses this function to load'''
     if os.environ.get('PY5_IMPORTED_MODE', 'False').lower() == 'false':
@@ -62,3 +362,15 @@ def load_plugin() -> None:
     c_e_a = MainCPythonBackend._cmd_editor_autocomplete
     MainCPythonBackend._original_editor_autocomplete = c_e_a
     MainCPythonBackend._cmd_editor_autocomplete = patched_editor_autocomplete
+    if int(get_version()[0]) >= 4:
+        MainCPythonBackend._cmd_get_completion_details = (
+          patched_get_completion_details
+        )
+    # %py5run runs sketches without restarting the backend (warm runner)
+    get_backend().add_command('py5run', cmd_py5run)
+    if int(get_version()[0]) >= 4:
+        # run_sketch.py and %py5run both go through run_code
+        imported._original_run_code = imported.run_code
+        imported.run_code = patched_run_code
+        get_backend().add_command('Py5profile', cmd_py5profile)
+        get_backend().add_command('Py5memory', cmd_py5memory)
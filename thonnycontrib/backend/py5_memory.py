@@ -0,0 +1,211 @@
+'''per-frame allocation tracking for imported mode sketches
+   tracemalloc runs for the whole sketch; around each draw() a pre and a post
+   hook read the traced memory (cheap) for what the frame allocated at its
+   peak and what it kept, and once per REPORT_INTERVAL a snapshot is compared
+   with the previous one to find the source lines whose memory grew, which
+   is sent to the frontend's memory view with the totals and gc activity
+
+   objects created and freed within a frame (a frame's garbage) are gone by
+   its post hook, so the frame after each report is sampled: a one-shot
+   profile hook takes a snapshot as draw() returns, its locals still alive,
+   and compares it with the report's to find what that frame allocated by
+   line; temporaries dropped before draw() returns still only show in the
+   frame's peak
+'''
+
+import gc
+import linecache
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+HOOK_NAME = 'thonny_py5mode_memory'
+EVENT_TYPE = 'Py5Memory'
+# seconds between two snapshots (and reports), snapshots are not cheap
+REPORT_INTERVAL = 1.0
+# frames kept per allocation, enough to get from py5 or numpy to the sketch
+TRACEBACK_FRAMES = 16
+# source lines sent per report, the ones that grew the most
+MAX_ROWS = 100
+
+
+class SketchMemoryTracker:
+    '''measure each frame's allocations and report them with the lines that
+    allocated memory still alive, to send(dict)'''
+
+    def __init__(self, sketch_path: str, send: Callable[[dict], None]):
+        self.sketch_path = os.path.abspath(sketch_path)
+        self.sketch_dir = os.path.join(os.path.dirname(self.sketch_path), '')
+        self.send = send
+        self.started = time.perf_counter()
+        self.frame_count = 0
+        self.reports = 0
+        self.peak = 0  # the highest traced memory so far
+        self.previous = {}  # the last report's line sizes and counts
+        self.sample_code = None  # the sampled frame's draw() code
+        self.sample_lines = None  # its line sizes and counts as it returned
+        self.sample_peak = 0  # its peak before the snapshot
+        self.reset_interval()
+        self.gc_collections = 0
+        self.gc_seconds = 0.0
+        self.gc_started = None
+
+    def reset_interval(self) -> None:
+        self.interval_started = time.perf_counter()
+        self.frames = 0
+        self.frame_start = 0
+        self.frame_peak_total = 0
+        self.frame_peak_max = 0
+        self.kept_total = 0
+
+    def install(self, sketch) -> None:
+        tracemalloc.start(TRACEBACK_FRAMES)
+        gc.callbacks.append(self.gc_callback)
+        sketch._add_post_hook('setup', HOOK_NAME, self.post_setup)
+        sketch._add_pre_hook('draw', HOOK_NAME, self.pre_draw)
+        sketch._add_post_hook('draw', HOOK_NAME, self.post_draw)
+        print('py5 memory tracking is on, see View > py5 memory (the sketch '
+              'runs slower while traced)', file=sys.stderr)
+
+    def uninstall(self) -> None:
+        '''stop tracing, once the sketch has ended'''
+        if self.gc_callback in gc.callbacks:
+            gc.callbacks.remove(self.gc_callback)
+        tracemalloc.stop()
+
+    def gc_callback(self, phase: str, info: dict) -> None:
+        if phase == 'start':
+            self.gc_started = time.perf_counter()
+        elif self.gc_started is not None:
+            self.gc_collections += 1
+            self.gc_seconds += time.perf_counter() - self.gc_started
+            self.gc_started = None
+
+    def post_setup(self, sketch) -> None:
+        # the first report, what the sketch's code and setup() kept, is the
+        # baseline the next ones grow from
+        self.report(sketch)
+
+    def pre_draw(self, sketch) -> None:
+        if not self.reports:
+            self.report(sketch)  # the sketch has no setup()
+        if self.sample_lines is None and self.frames == 0:
+            self.start_sample(sketch)  # the first frame after a report
+        self.frame_start = tracemalloc.get_traced_memory()[0]
+        self.sample_peak = 0
+        tracemalloc.reset_peak()
+
+    def start_sample(self, sketch) -> None:
+        # _py5_bridge is not a public api; the code is read for each sample,
+        # hot reload may have replaced it
+        draw = sketch._py5_bridge._functions.get('draw')
+        self.sample_code = getattr(draw, '__code__', None)
+        if self.sample_code is not None:
+            sys.setprofile(self.sample_on_return)
+
+    def sample_on_return(self, frame, event: str, arg) -> None:
+        '''profile hook, called on every call and return in the sketch's
+        thread until draw() returns'''
+        if event != 'return' or frame.f_code is not self.sample_code:
+            return
+        sys.setprofile(None)
+        current, peak = tracemalloc.get_traced_memory()
+        self.sample_lines = self.get_lines()
+        # the snapshot isn't the frame's, leave it out of its peak and kept
+        self.frame_start += tracemalloc.get_traced_memory()[0] - current
+        self.sample_peak = peak
+        tracemalloc.reset_peak()
+
+    def post_draw(self, sketch) -> None:
+        if sys.getprofile() == self.sample_on_return:
+            sys.setprofile(None)  # draw() wasn't the function sampled
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, self.sample_peak)
+        frame_peak = peak - self.frame_start
+        self.frames += 1
+        self.frame_count += 1
+        self.frame_peak_total += frame_peak
+        self.frame_peak_max = max(self.frame_peak_max, frame_peak)
+        self.kept_total += current - self.frame_start
+        self.peak = max(self.peak, peak)
+        if time.perf_counter() - self.interval_started >= REPORT_INTERVAL:
+            self.report(sketch)
+
+    def get_lines(self) -> dict[tuple[str, int], list[int]]:
+        '''traced memory as [size, count] per source line, each allocation
+        counted at its innermost frame in the sketch's folder, if any'''
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+          tracemalloc.Filter(False, tracemalloc.__file__),
+          tracemalloc.Filter(False, __file__),
+        ])
+        lines = {}
+        for statistic in snapshot.statistics('traceback'):
+            frames = statistic.traceback
+            frame = next(
+              (frame for frame in reversed(frames)
+               if frame.filename.startswith(self.sketch_dir)),
+              frames[-1]
+            )
+            entry = lines.setdefault((frame.filename, frame.lineno), [0, 0])
+            entry[0] += statistic.size
+            entry[1] += statistic.count
+        return lines
+
+    def report(self, sketch) -> None:
+        now = time.perf_counter()
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak)
+        lines = self.get_lines()
+        frames = max(self.frames, 1)
+        # the first report, the baseline, has no frames to put lines in
+        baseline = not self.reports
+        # the frame sampled after the previous report, compared with it
+        sample = self.sample_lines or {}
+        rows = []
+        for filename, line in lines.keys() | sample.keys():
+            old_size, old_count = self.previous.get((filename, line), (0, 0))
+            size, count = lines.get((filename, line), (0, 0))
+            # a line missing from the sample had nothing alive then
+            sample_size, _ = sample.get(
+              (filename, line), (0, 0) if sample else (old_size, old_count)
+            )
+            if baseline or (size <= old_size and sample_size <= old_size):
+                continue
+            rows.append(dict(
+              filename=filename,
+              line=line,
+              code=linecache.getline(filename, line).strip(),
+              in_sketch=filename.startswith(self.sketch_dir),
+              frame_bytes=max(sample_size - old_size, 0),
+              bytes_per_frame=max(size - old_size, 0) / frames,
+              blocks_per_frame=max(count - old_count, 0) / frames,
+              size=size,
+              count=count,
+            ))
+        rows.sort(
+          key=lambda row: max(row['frame_bytes'], row['bytes_per_frame']),
+          reverse=True
+        )
+        self.previous = lines
+        self.sample_lines = None
+        self.reports += 1
+        seconds = now - self.interval_started
+        self.send(dict(
+          sketch_path=self.sketch_path,
+          frame_count=self.frame_count,
+          baseline=baseline,
+          elapsed=now - self.started,
+          current=current,
+          peak=self.peak,
+          frame_peak=self.frame_peak_total / frames,
+          frame_peak_max=self.frame_peak_max,
+          kept_per_frame=self.kept_total / frames,
+          gc_per_second=self.gc_collections / seconds if seconds else 0.0,
+          gc_ms_per_second=self.gc_seconds * 1000 / seconds if seconds else 0.0,
+          rows=rows[:MAX_ROWS],
+        ))
+        self.gc_collections, self.gc_seconds = 0, 0.0
+        # the snapshot itself allocates and takes time, leave it out
+        self.reset_interval()
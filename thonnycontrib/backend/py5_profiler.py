@@ -0,0 +1,116 @@
+'''deterministic profiling of imported mode sketches
+   cProfile is switched on around setup() and around each draw() (py5 calls
+   both from its animation thread) by pre and post hooks, for a number of
+   frames or seconds; the results are then sent to the frontend's profile
+   view, while the sketch keeps running
+'''
+
+import cProfile
+import os
+import pstats
+import sys
+import time
+from typing import Callable
+
+HOOK_NAME = 'thonny_py5mode_profile'
+EVENT_TYPE = 'Py5Profile'
+# functions sent to the frontend per phase, the ones with most cumulative time
+MAX_ROWS = 300
+# frames profiled when neither frames nor seconds are given
+DEFAULT_FRAMES = 300
+
+
+def get_rows(profile: cProfile.Profile, frames: int) -> list[dict]:
+    '''one row per function profiled, slowest (cumulative) first'''
+    stats = pstats.Stats(profile).stats
+    rows = []
+    for (filename, line, function), entry in stats.items():
+        primitive_calls, calls, total, cumulative, _ = entry
+        rows.append(dict(
+          function=function,
+          filename=filename,
+          line=line,
+          calls=calls,
+          primitive_calls=primitive_calls,
+          total_ms=total * 1000,
+          cumulative_ms=cumulative * 1000,
+          per_call_ms=cumulative * 1000 / calls if calls else 0.0,
+          per_frame_ms=cumulative * 1000 / max(frames, 1),
+        ))
+    rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+    return rows[:MAX_ROWS]
+
+
+class SketchProfiler:
+    '''profile setup() and the first frames' draw() calls, then pass the
+    results to send(dict); the profile ends after frames or seconds, or
+    after DEFAULT_FRAMES without either'''
+
+    def __init__(self, sketch_path: str, frames: int | None,
+                 seconds: float | None, send: Callable[[dict], None]):
+        self.sketch_path = sketch_path
+        if frames is None and seconds is None:
+            frames = DEFAULT_FRAMES
+        self.frames_wanted = frames
+        self.seconds = seconds
+        self.send = send
+        self.setup_profile = cProfile.Profile()
+        self.draw_profile = cProfile.Profile()
+        self.frames = 0
+        self.started = None
+        self.done = False
+
+    def install(self, sketch) -> None:
+        sketch._add_pre_hook('setup', HOOK_NAME, self.pre_setup)
+        sketch._add_post_hook('setup', HOOK_NAME, self.post_setup)
+        sketch._add_pre_hook('draw', HOOK_NAME, self.pre_draw)
+        sketch._add_post_hook('draw', HOOK_NAME, self.post_draw)
+
+    def pre_setup(self, sketch) -> None:
+        self.setup_profile.enable()
+
+    def post_setup(self, sketch) -> None:
+        self.setup_profile.disable()
+        # _py5_bridge is not a public api
+        if not sketch._py5_bridge.has_function('draw'):
+            self.finish(sketch)  # a static sketch, setup() is all
+
+    def pre_draw(self, sketch) -> None:
+        if self.started is None:
+            self.started = time.perf_counter()
+        if not self.done:
+            self.draw_profile.enable()
+
+    def post_draw(self, sketch) -> None:
+        if self.done:
+            return
+        self.draw_profile.disable()
+        self.frames += 1
+        elapsed = time.perf_counter() - self.started
+        if (self.frames_wanted and self.frames >= self.frames_wanted) or (
+              self.seconds and elapsed >= self.seconds):
+            self.finish(sketch)
+
+    def finish(self, sketch, ended: bool = False) -> None:
+        '''send the profile, ended if the sketch stopped before its end
+        (closed, or an error), with the frames profiled so far'''
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        self.done = True
+        # still on if setup() or draw() raised
+        self.setup_profile.disable()
+        self.draw_profile.disable()
+        for method_name in ('setup', 'draw'):
+            sketch._remove_pre_hook(method_name, HOOK_NAME)
+            sketch._remove_post_hook(method_name, HOOK_NAME)
+        self.send(dict(
+          sketch_path=self.sketch_path,
+          sketch_dir=os.path.dirname(os.path.abspath(self.sketch_path)),
+          frames=self.frames,
+          seconds=elapsed,
+          setup_rows=get_rows(self.setup_profile, 1),
+          draw_rows=get_rows(self.draw_profile, self.frames),
+        ))
+        after = ('the sketch ended before the profile did' if ended
+                 else 'the sketch goes on unprofiled')
+        print(f'py5 profile of {self.frames} frames ({elapsed:.1f} s) is in '
+              f'View > py5 profile, {after}', file=sys.stderr)
@@ -5,38 +5,63 @@ interacts with py5mode backend (backend > py5_imported_mode_backend.py)
 import builtins
 import keyword
 import os
-import pathlib
 import platform
 import shutil
-import site
 import subprocess
 import sys
 import tkinter as tk
-import types
 import webbrowser
-from distutils.sysconfig import get_python_lib
-from importlib import machinery, util
+from logging import getLogger
 from tkinter.messagebox import showerror, showinfo
 
-from thonny import editors, get_runner, get_workbench, running, token_utils
+from thonny import editors, get_runner, get_version, get_workbench, running, token_utils
 from thonny.common import BackendEvent
 from thonny.languages import tr
 from thonny.running import Runner
 from thonny.shell import BaseShellText
+from thonnycontrib.backend.py5_channel import (
+    CHANNEL_ENV,
+    FRAME_STATS,
+    RELOAD,
+    WINDOW_MOVED,
+    WINDOW_MOVED_STRUCT,
+    decode_frame_stats,
+)
 
 from .about_plugin import add_about_py5mode_command, open_about_plugin
-from .install_jdk import install_jdk
+from .frame_timing_view import FRAME_STATS_EVENT, FrameTimingView
+from .memory_view import MEMORY_EVENT, MemoryView, show_memory_report
+from .profile_view import PROFILE_EVENT, ProfileView, show_profile
+from .py5_keywords import get_builtin_pattern
+from .run_sketch_resolver import (
+    RunSketchNotFoundError,
+    clear_run_sketch_cache,
+    get_run_sketch_path,
+)
+from .sketch_channel import ChannelServer
+from .sketch_output import FLUSH_DELAY_MS, LocationSaver, MoveFilter, OutputThrottle
 
 try:  # thonny 4 package layout
     from thonny import get_sys_path_directory_containg_plugins
 except ImportError:  # thonny 3 package layout
     pass
-# modified tkcolorpicker (by j4321) to work with thonny for macos
-# now vendored on this same repo
-from .py5colorpicker.tkcolorpicker import modeless_colorpicker
+
+logger = getLogger(__name__)
 
 _PY5_IMPORTED_MODE = "run.py5_imported_mode"
+_PY5_WARM_RUNNER = "run.py5_warm_runner"
+_PY5_REPORT_STARTUP = "run.py5_report_startup"
+_PY5_HOT_RELOAD = "run.py5_hot_reload"
+_PY5_LOCATION = "run.py5_location"
+_PY5_OUTPUT_THROTTLE = "run.py5_output_throttle"
+_PY5_COLLAPSE_OUTPUT = "run.py5_collapse_repeated_lines"
+_PY5_PROFILE_FRAMES = "run.py5_profile_frames"
+_PY5_PROFILE_SECONDS = "run.py5_profile_seconds"
 color_selector_open = False
+move_filter = None
+location_saver = None
+sketch_channel = None
+output_throttle = None
 
 
 def apply_recommended_py5_config() -> None:
@@ -51,8 +76,9 @@ def apply_recommended_py5_config() -> None:
     get_workbench().reload_themes()
 
 
-def execute_imported_mode() -> None:
-    """run imported mode script using py5_tools run_sketch"""
+def execute_imported_mode(instrument: str = "") -> None:
+    """run imported mode script using py5_tools run_sketch, or instrumented
+    ("profile" or "memory") by the backend"""
     current_editor = get_workbench().get_editor_notebook().get_current_editor()
     current_file = current_editor.get_filename()
 
@@ -64,34 +90,45 @@ def execute_imported_mode() -> None:
     if current_file and current_file.split(".")[-1] in ("py", "py5", "pyde"):
         # save and run py5 imported mode
         current_editor.save_file()
-        user_packages = str(site.getusersitepackages())
-        site_packages = str(site.getsitepackages()[0])
-        plug_packages = util.find_spec("py5_tools").submodule_search_locations
-        run_sketch_locations = [
-            pathlib.Path(user_packages + "/py5_tools/tools/run_sketch.py"),
-            pathlib.Path(site_packages + "/py5_tools/tools/run_sketch.py"),
-            pathlib.Path(plug_packages[0] + "/tools/run_sketch.py"),
-            pathlib.Path(get_python_lib() + "/py5_tools/tools/run_sketch.py"),
-        ]
-
-        for location in run_sketch_locations:
-            # if location matches py5_tools path, use it
-            if location.is_file():
-                run_sketch = location
-                break
-
-        # set switch so Sketch will report window location
-        py5_switches = "--py5_options external"
+        try:
+            run_sketch = get_run_sketch_path()
+        except RunSketchNotFoundError as e:
+            showerror("py5 sketch runner not found", str(e), master=get_workbench())
+            return
+
+        py5_options = []
+        if sketch_channel is None:
+            # set switch so Sketch will report window location on stderr,
+            # with the side channel the backend reports it there instead (or
+            # sets the switch itself if it can't connect)
+            py5_options.append("external")
         # retrieve last display window location
-        py5_loc = get_workbench().get_option("run.py5_location")
+        py5_loc = get_workbench().get_option(_PY5_LOCATION)
         if py5_loc:
             # add location switch to command line
-            py5_switches += " location=" + ",".join(map(str, py5_loc))
+            py5_options.append("location=" + ",".join(map(str, py5_loc)))
+        py5_switches = " ".join(["--py5_options", *py5_options]) if py5_options else ""
 
         # run command to execute sketch
         working_directory = os.path.dirname(current_file)
         cd_cmd_line = running.construct_cd_command(working_directory) + "\n"
-        cmd_parts = ["%Run", str(run_sketch), current_file]
+        if instrument == "memory":
+            # capitalized magic commands: a fresh backend, as for %Run
+            cmd_parts = ["%Py5memory", current_file]
+        elif instrument == "profile":
+            # a number of seconds replaces the number of frames
+            seconds = get_workbench().get_option(_PY5_PROFILE_SECONDS)
+            frames = get_workbench().get_option(_PY5_PROFILE_FRAMES)
+            cmd_parts = ["%Py5profile", current_file]
+            if seconds:
+                cmd_parts += ["--seconds", str(seconds)]
+            else:
+                cmd_parts += ["--frames", str(frames)]
+        elif get_workbench().get_option(_PY5_WARM_RUNNER):
+            # lowercase magic command: backend (and jvm) are kept alive
+            cmd_parts = ["%py5run", current_file]
+        else:
+            cmd_parts = ["%Run", str(run_sketch), current_file]
         exe_cmd_line = running.construct_cmd_line(cmd_parts) + " "
         exe_cmd_line += py5_switches + "\n"
         running.get_shell().submit_magic_command(cd_cmd_line + exe_cmd_line)
@@ -104,17 +141,8 @@ def patched_execute_current(self: Runner, command_name: str) -> None:
 
 def patch_token_coloring() -> None:
     """add py5 keywords to syntax highlighting"""
-    spec = util.find_spec("py5_tools")
-    # cannot use `dir(py5)` because of jvm check, hence direct loading
-    path = pathlib.Path(spec.submodule_search_locations[0]) / "reference.py"
-    loader = machinery.SourceFileLoader("py5_tools_reference", str(path))
-    module = types.ModuleType(loader.name)
-    loader.exec_module(module)
-    # add keywords to thonny builtin list
-    patched_builtinlist = token_utils._builtinlist + module.PY5_ALL_STR
-    matches = token_utils.matches_any("builtin", patched_builtinlist)
-    patched_BUILTIN = r'([^.\'"\\#]\b|^)' + (matches + r"\b")
-    token_utils.BUILTIN = patched_BUILTIN
+    # pattern is cached on disk per py5 version, see py5_keywords.py
+    token_utils.BUILTIN = get_builtin_pattern()
 
 
 def set_py5_imported_mode() -> None:
@@ -124,6 +152,10 @@ def set_py5_imported_mode() -> None:
     else:
         p_i_m = str(get_workbench().get_option(_PY5_IMPORTED_MODE))
         os.environ["PY5_IMPORTED_MODE"] = p_i_m
+        p_r_s = str(get_workbench().get_option(_PY5_REPORT_STARTUP))
+        os.environ["PY5_REPORT_STARTUP"] = p_r_s
+        p_h_r = str(get_workbench().get_option(_PY5_HOT_RELOAD))
+        os.environ["PY5_HOT_RELOAD"] = p_h_r
 
         # switch on/off py5 run button behavior
         if get_workbench().get_option(_PY5_IMPORTED_MODE):
@@ -146,17 +178,67 @@ def set_py5_imported_mode() -> None:
 
 def toggle_py5_imported_mode() -> None:
     """toggle py5 imported mode settings"""
+    # imported here, not at plugin load, to keep thonny's startup fast
+    from .install_jdk import install_jdk
+
     var = get_workbench().get_variable(_PY5_IMPORTED_MODE)
     var.set(not var.get())
     install_jdk()
+    # look for run_sketch.py again, in case py5 was reinstalled meanwhile
+    clear_run_sketch_cache()
     set_py5_imported_mode()
 
 
+def toggle_py5_warm_runner() -> None:
+    """toggle keeping the jvm running in the backend between sketch runs"""
+    var = get_workbench().get_variable(_PY5_WARM_RUNNER)
+    var.set(not var.get())
+    # start the next run from a fresh backend either way
+    if get_workbench().get_option(_PY5_IMPORTED_MODE):
+        get_runner().restart_backend(False)
+
+
+def toggle_py5_hot_reload() -> None:
+    """toggle reloading the running sketch's functions when its file is saved"""
+    var = get_workbench().get_variable(_PY5_HOT_RELOAD)
+    var.set(not var.get())
+    os.environ["PY5_HOT_RELOAD"] = str(var.get())
+    # a kept alive backend only reads the environment when it starts
+    if get_workbench().get_option(_PY5_IMPORTED_MODE):
+        get_runner().restart_backend(False)
+
+
+def toggle_py5_collapse_output() -> None:
+    """toggle counting repeated sketch output lines instead of showing them"""
+    var = get_workbench().get_variable(_PY5_COLLAPSE_OUTPUT)
+    var.set(not var.get())
+    if output_throttle is not None:
+        output_throttle.collapse = var.get()
+
+
+def run_instrumented(instrument: str) -> None:
+    """run the sketch profiled or with its memory tracked, see the py5
+    profile and py5 memory views"""
+    if not get_workbench().get_option(_PY5_IMPORTED_MODE):
+        showerror(
+            tr("py5 imported mode"),
+            tr("This needs py5 > Imported mode for py5 on."),
+            master=get_workbench(),
+        )
+        return
+    execute_imported_mode(instrument)
+
+
 def color_selector() -> None:
     """open tkinter color selector"""
     global color_selector_open
     # ... if one is not already open
     if not color_selector_open:
+        # modified tkcolorpicker (by j4321) to work with thonny for macos
+        # now vendored on this same repo; imported on first use since it
+        # pulls in PIL and pyperclip
+        from .py5colorpicker.tkcolorpicker import modeless_colorpicker
+
         color_selector_open = True
         modeless_colorpicker(title=tr("Color selector"))
         color_selector_open = False
@@ -181,19 +263,113 @@ def convert_code(translator) -> None:
         showinfo("py5 Conversion", "Conversion complete", master=workbench)
 
 
+def get_location_saver() -> LocationSaver:
+    global location_saver
+    if location_saver is None:
+        location_saver = LocationSaver(get_workbench(), _PY5_LOCATION)
+    return location_saver
+
+
+def get_move_filter() -> MoveFilter:
+    """create the display window move filter on first output"""
+    global move_filter
+    if move_filter is None:
+        move_filter = MoveFilter(get_location_saver().update)
+    return move_filter
+
+
+def start_sketch_channel() -> None:
+    """listen for running sketches' side channel, the backend finds it in
+    its environment (see backend > py5_channel.py)"""
+    global sketch_channel
+    try:
+        sketch_channel = ChannelServer(get_workbench())
+    except OSError:
+        # sketches report window moves on stderr then, like on thonny 3
+        logger.exception("py5 side channel not available")
+        return
+    os.environ[CHANNEL_ENV] = sketch_channel.address
+
+    def handle_window_moved(payload: bytes) -> None:
+        get_location_saver().update(*WINDOW_MOVED_STRUCT.unpack(payload))
+
+    def handle_frame_stats(payload: bytes) -> None:
+        msg = BackendEvent(FRAME_STATS_EVENT, **decode_frame_stats(payload))
+        get_workbench().event_generate(FRAME_STATS_EVENT, event=msg)
+
+    sketch_channel.handlers[WINDOW_MOVED] = handle_window_moved
+    sketch_channel.handlers[FRAME_STATS] = handle_frame_stats
+    get_workbench().bind("Save", request_hot_reload, True)
+
+
+def request_hot_reload(event) -> None:
+    """have the running sketch look for changes right away"""
+    if get_workbench().get_option(_PY5_HOT_RELOAD):
+        sketch_channel.send(RELOAD)
+
+
+def get_output_throttle(shell: BaseShellText) -> OutputThrottle:
+    """create the sketch output throttle on first output"""
+    global output_throttle
+    if output_throttle is None:
+
+        def emit(data: str, stream_name: str) -> None:
+            msg = BackendEvent("ProgramOutput", data=data, stream_name=stream_name)
+            BaseShellText._original_handle_program_output(shell, msg)
+
+        max_lines = get_workbench().get_option("shell.max_lines")
+        output_throttle = OutputThrottle(shell, emit, max_lines)
+        output_throttle.collapse = get_workbench().get_option(_PY5_COLLAPSE_OUTPUT)
+    return output_throttle
+
+
+def show_output(shell: BaseShellText, msg: BackendEvent) -> None:
+    """pass sketch output to the shell, batched in imported mode"""
+    workbench = get_workbench()
+    if workbench.get_option(_PY5_IMPORTED_MODE) and workbench.get_option(
+        _PY5_OUTPUT_THROTTLE
+    ):
+        get_output_throttle(shell).feed(msg.data, msg.stream_name)
+    else:
+        BaseShellText._original_handle_program_output(shell, msg)
+
+
 def patched_handle_program_output(self, msg: BackendEvent) -> None:
     """catch display window movements and write coords to the config file"""
-    if msg.__getitem__("data")[:8] == "__MOVE__":
-        py5_loc = msg.__getitem__("data")[9:-1].split(" ")
-        # write display window location to config file
-        if len(py5_loc) == 2:
-            py5_loc = py5_loc[0] + "," + py5_loc[1]
-            get_workbench().set_option("run.py5_location", py5_loc)
-        # skip the rest of the function so the shell won't display coords
+    if sketch_channel is not None and sketch_channel.connection is not None:
+        # the backend said hello, moves come through the channel and the
+        # output is the sketch's own
+        show_output(self, msg)
         return
+    output_filter = get_move_filter()
+    had_held_output = bool(output_filter.held)
+    data = output_filter.feed(msg.data, msg.stream_name)
+    if output_filter.held and not had_held_output:
+        # show it anyway if the rest of a move line doesn't come
+        self.after(FLUSH_DELAY_MS, lambda: flush_held_output(self))
+
+    # the shell won't display coords, other listeners still get msg as is
+    if data == msg.data:
+        show_output(self, msg)
+    elif data:
+        stream_name = msg.stream_name
+        msg = BackendEvent("ProgramOutput", data=data, stream_name=stream_name)
+        show_output(self, msg)
+
+
+def flush_held_output(shell: BaseShellText) -> None:
+    """show output held back as a possible move line that wasn't one"""
+    for stream_name, data in get_move_filter().flush().items():
+        msg = BackendEvent("ProgramOutput", data=data, stream_name=stream_name)
+        show_output(shell, msg)
+
 
-    # print the rest of the shell output as usual
-    BaseShellText._original_handle_program_output(self, msg)
+def patched_handle_toplevel_response(self, msg) -> None:
+    """show the sketch's remaining output before thonny's prompt"""
+    flush_held_output(self)
+    if output_throttle is not None:
+        output_throttle.flush(final=True)
+    BaseShellText._original_handle_toplevel_response(self, msg)
 
 
 def show_sketch_folder() -> None:
@@ -222,6 +398,13 @@ def show_sketch_folder() -> None:
 
 def load_plugin() -> None:
     get_workbench().set_default(_PY5_IMPORTED_MODE, False)
+    get_workbench().set_default(_PY5_WARM_RUNNER, False)
+    get_workbench().set_default(_PY5_REPORT_STARTUP, False)
+    get_workbench().set_default(_PY5_HOT_RELOAD, False)
+    get_workbench().set_default(_PY5_OUTPUT_THROTTLE, True)
+    get_workbench().set_default(_PY5_COLLAPSE_OUTPUT, False)
+    get_workbench().set_default(_PY5_PROFILE_FRAMES, 300)
+    get_workbench().set_default(_PY5_PROFILE_SECONDS, 0)
     get_workbench().add_command(
         "toggle_py5_imported_mode",
         "py5",
@@ -230,6 +413,46 @@ def load_plugin() -> None:
         flag_name=_PY5_IMPORTED_MODE,
         group=10,
     )
+    get_workbench().add_command(
+        "toggle_py5_warm_runner",
+        "py5",
+        tr("Keep py5 running between runs"),
+        toggle_py5_warm_runner,
+        flag_name=_PY5_WARM_RUNNER,
+        group=10,
+    )
+    get_workbench().add_command(
+        "toggle_py5_hot_reload",
+        "py5",
+        tr("Hot reload sketch on save"),
+        toggle_py5_hot_reload,
+        flag_name=_PY5_HOT_RELOAD,
+        group=10,
+    )
+    get_workbench().add_command(
+        "toggle_py5_collapse_output",
+        "py5",
+        tr("Collapse repeated output lines"),
+        toggle_py5_collapse_output,
+        flag_name=_PY5_COLLAPSE_OUTPUT,
+        group=10,
+    )
+    if int(get_version()[0]) >= 4:
+        # the backend registers %Py5profile and %Py5memory with thonny 4 only
+        get_workbench().add_command(
+            "py5_profile_sketch",
+            "py5",
+            tr("Profile sketch"),
+            lambda: run_instrumented("profile"),
+            group=15,
+        )
+        get_workbench().add_command(
+            "py5_track_memory",
+            "py5",
+            tr("Track sketch memory"),
+            lambda: run_instrumented("memory"),
+            group=15,
+        )
     get_workbench().add_command(
         "apply_recommended_py5_config",
         "py5",
@@ -265,6 +488,14 @@ def load_plugin() -> None:
         "open_folder", "py5", tr("Show sketch folder"), show_sketch_folder, group=40
     )
     add_about_py5mode_command(50)
+    if int(get_version()[0]) >= 4:
+        # the backend side of the channel needs thonny 4's plug-in path
+        start_sketch_channel()
+    get_workbench().add_view(FrameTimingView, tr("py5 frame timing"), "se")
+    get_workbench().add_view(ProfileView, tr("py5 profile"), "s")
+    get_workbench().bind(PROFILE_EVENT, show_profile, True)
+    get_workbench().add_view(MemoryView, tr("py5 memory"), "s")
+    get_workbench().bind(MEMORY_EVENT, show_memory_report, True)
     patch_token_coloring()
     set_py5_imported_mode()
 
@@ -273,3 +504,6 @@ def load_plugin() -> None:
     h_p_o = BaseShellText._handle_program_output
     BaseShellText._original_handle_program_output = h_p_o
     BaseShellText._handle_program_output = patched_handle_program_output
+    h_t_r = BaseShellText._handle_toplevel_response
+    BaseShellText._original_handle_toplevel_response = h_t_r
+    BaseShellText._handle_toplevel_response = patched_handle_toplevel_response
@@ -0,0 +1,117 @@
+"""py5 frame timing view
+shows the frame rate and draw() times the running sketch reports (see
+backend > py5_frame_stats.py) a few times per second
+"""
+
+import collections
+import tkinter as tk
+from tkinter import ttk
+
+from thonny import get_workbench
+from thonny.languages import tr
+
+# the backend event carrying the sketch's frame timing
+FRAME_STATS_EVENT = "Py5FrameStats"
+# frame rates kept for the history graph, 15 s at 4 events per second
+FPS_HISTORY = 60
+CANVAS_HEIGHT = 80
+BAR_COLOR = "#4a90d9"
+LINE_COLOR = "#2a9d4a"
+
+
+class FrameTimingView(ttk.Frame):
+    """frame rate, draw() time percentiles, dropped frames, a histogram of
+    the recent draw() times and a history of the frame rate"""
+
+    def __init__(self, master):
+        super().__init__(master, padding=5)
+        self.columnconfigure(1, weight=1)
+        self.fps_history = collections.deque(maxlen=FPS_HISTORY)
+        self.last_stats = None
+        self.values = {}
+        rows = (
+            ("fps", tr("Frame rate")),
+            ("draw_ms", tr("draw() time")),
+            ("percentiles", tr("p50 / p95 / p99")),
+            ("max_ms", tr("Slowest draw()")),
+            ("dropped", tr("Dropped frames")),
+            ("frame_count", tr("Frame")),
+        )
+        for row, (key, label) in enumerate(rows):
+            ttk.Label(self, text=label).grid(row=row, column=0, sticky="w")
+            self.values[key] = ttk.Label(self, text="-")
+            self.values[key].grid(row=row, column=1, sticky="w", padx=(10, 0))
+
+        self.histogram = tk.Canvas(self, height=CANVAS_HEIGHT, highlightthickness=0)
+        self.histogram.grid(row=len(rows), column=0, columnspan=2, sticky="ew")
+        self.history = tk.Canvas(self, height=CANVAS_HEIGHT, highlightthickness=0)
+        self.history.grid(row=len(rows) + 1, column=0, columnspan=2, sticky="ew")
+
+        get_workbench().bind(FRAME_STATS_EVENT, self.handle_frame_stats, True)
+        get_workbench().bind("ToplevelResponse", self.handle_run_end, True)
+        self.bind("<Map>", self.handle_map, True)
+
+    def handle_frame_stats(self, msg) -> None:
+        if self.last_stats and msg.frame_count < self.last_stats.frame_count:
+            self.fps_history.clear()  # a new run
+        self.fps_history.append(msg.fps)
+        self.last_stats = msg
+        # while hidden, the history is kept and drawing waits until shown
+        if self.winfo_ismapped():
+            self.show_stats(msg)
+
+    def handle_map(self, event) -> None:
+        if self.last_stats:
+            self.show_stats(self.last_stats)
+
+    def show_stats(self, msg) -> None:
+        self.values["fps"].configure(text=f"{msg.fps:.1f}")
+        self.values["draw_ms"].configure(text=f"{msg.draw_ms:.2f} ms")
+        self.values["percentiles"].configure(
+            text=f"{msg.p50_ms:.2f} / {msg.p95_ms:.2f} / {msg.p99_ms:.2f} ms"
+        )
+        self.values["max_ms"].configure(text=f"{msg.max_ms:.2f} ms")
+        self.values["dropped"].configure(text=str(msg.dropped))
+        self.values["frame_count"].configure(text=str(msg.frame_count))
+        self.draw_histogram(msg.histogram, msg.histogram_bounds)
+        self.draw_history()
+
+    def handle_run_end(self, msg) -> None:
+        if self.fps_history:
+            self.values["fps"].configure(text=tr("stopped"))
+
+    def draw_histogram(self, counts: list[int], bounds: list[float]) -> None:
+        """one bar per draw() time bucket, labelled with its upper bound"""
+        canvas = self.histogram
+        canvas.delete("all")
+        width = canvas.winfo_width()
+        bar_width = width / len(counts)
+        label_height = 14
+        tallest = max(counts) or 1
+        labels = [f"<{bound:g}" for bound in bounds] + [f"{bounds[-1]:g}+"]
+        for i, (count, label) in enumerate(zip(counts, labels)):
+            height = (CANVAS_HEIGHT - label_height) * count / tallest
+            x0, x1 = i * bar_width + 2, (i + 1) * bar_width - 2
+            bottom = CANVAS_HEIGHT - label_height
+            canvas.create_rectangle(
+                x0, bottom - height, x1, bottom, fill=BAR_COLOR, width=0
+            )
+            canvas.create_text(
+                (x0 + x1) / 2, bottom + 1, text=label + " ms", anchor="n"
+            )
+
+    def draw_history(self) -> None:
+        """frame rate over the last FPS_HISTORY events"""
+        canvas = self.history
+        canvas.delete("all")
+        width = canvas.winfo_width()
+        top = max(self.fps_history)
+        if len(self.fps_history) < 2 or not top:
+            return
+        step = width / (FPS_HISTORY - 1)
+        points = []
+        for i, fps in enumerate(self.fps_history):
+            y = CANVAS_HEIGHT - 2 - (CANVAS_HEIGHT - 16) * fps / top
+            points += [i * step, y]
+        canvas.create_line(*points, fill=LINE_COLOR, width=2)
+        canvas.create_text(2, 2, text=f"{top:.0f} fps", anchor="nw")
@@ -1,24 +1,29 @@
 '''thonny-py5mode JDK installer.
 Checks for JDK and, if not found, installs it to Thonny's user directory.'''
 
-import re, shutil, jdk
+import json, re, shutil, jdk
 
 from pathlib import Path, PurePath
 from threading import Thread
 
-from os import environ as env, scandir, rename, PathLike
-from os.path import islink, realpath
+from os import environ as env, scandir, PathLike
+from os.path import expanduser, islink, realpath
 
 from typing import Any, Callable, Literal, TypeAlias
 from collections.abc import Iterable, Iterator
 
 import tkinter as tk
 from tkinter import ttk
-from tkinter.messagebox import showinfo
+from tkinter.messagebox import showerror, showinfo
 
 from thonny import get_workbench, ui_utils, THONNY_USER_DIR
 from thonny.languages import tr
 
+from .jdk_download import (
+    DownloadProgress, download_and_install, extraction_folder, get_jdk_archive,
+    install_local_archive, move_into_place)
+from .jdk_store import JdkStore
+
 StrPath: TypeAlias = str | PathLike[str]
 '''A type representing string-based filesystem paths.'''
 
@@ -47,6 +52,36 @@ THONNY_USER_PATH = Path(THONNY_USER_DIR)
 JDK_PATH = THONNY_USER_PATH / JDK_DIR
 '''Path for JDK installation subfolder.'''
 
+JDK_PROBE_PATH = THONNY_USER_PATH / 'py5mode_jdk.json'
+'''Where the last JDK found (path, version, mtime) is remembered.'''
+
+SYSTEM_JDK_FOLDERS = (
+    '/usr/lib/jvm', # Debian, Ubuntu, Fedora, Arch... packages
+    '/Library/Java/JavaVirtualMachines', # macOS installers
+    expanduser('~/Library/Java/JavaVirtualMachines'), # macOS per-user JDKs
+    Path(env.get('SDKMAN_DIR', expanduser('~/.sdkman')), 'candidates', 'java'),
+)
+'''Standard folders holding one subfolder per installed JDK.'''
+
+JDK_SHARED_DIR_OPTION, JDK_SHARED_DIR_ENV = (
+    'run.py5_jdk_shared_dir', 'PY5MODE_JDK_SHARED_DIR')
+'''Option (or environment variable) naming a folder of JDKs shared by every
+account, e.g. a read-only system path or a network share mount.'''
+
+JDK_ARCHIVE_OPTION, JDK_ARCHIVE_ENV = 'run.py5_jdk_archive', 'PY5MODE_JDK_ARCHIVE'
+'''Option (or environment variable) naming a local JDK archive to install
+from instead of downloading one.'''
+
+JDK_STORE_OPTION, JDK_STORE_ENV = 'run.py5_jdk_store', 'PY5MODE_JDK_STORE'
+'''Option (or environment variable) naming a content-addressed JDK store
+that Thonny user folders share, getting their JDK as links to it.'''
+
+JDK_STORE_REF = f'{JDK_DIR}-{jdk.OS}-{jdk.ARCH}'
+'''Name of the platform's JDK in the JDK store.'''
+
+RELEASE_VERSION = re.compile(r'^JAVA_VERSION="(?:1\.)?(\d+)', re.MULTILINE)
+'''Captures the major version from a JDK's release file ("1.8.0" -> 8).'''
+
 WORKBENCH = get_workbench()
 '''Thonny's workbench singleton instance.'''
 
@@ -55,10 +90,15 @@ def install_jdk() -> None: # Module's main entry-point function
 
     if is_java_home_set(): return # JAVA_HOME already points to required version
 
-    # Set a local JAVA_HOME to the detected JDK found in THONNY_USER_DIR:
-    if path := get_thonny_jdk_install(): set_java_home(path)
+    # Reuse the JDK found last time, if it's still there & unchanged; else
+    # look for one in THONNY_USER_DIR, the JDK store (linking it there), the
+    # shared JDK folder, then the system:
+    if path := (get_probed_jdk() or get_thonny_jdk_install() or
+                install_stored_jdk() or get_shared_jdk() or get_system_jdk()):
+        save_jdk_probe(path)
+        set_java_home(path) # Set a local JAVA_HOME to the detected JDK
 
-    # Otherwise, if Thonny doesn't have a proper JDK version...
+    # Otherwise, if there's no proper JDK version around...
     else: ui_utils.show_dialog(JdkDialog()) # ... ask permission to download 1.
 
 
@@ -66,13 +106,10 @@ def is_java_home_set() -> bool:
     '''Check system for existing JDK that meets the py5 version requirements.'''
 
     if java_home := env.get('JAVA_HOME'): # Check if JAVA_HOME is already set
-        system_jdk = 'TBD' # JDK version To-Be-Determined
-
         if islink(java_home):
             java_home = realpath(java_home) # If symlink, resolve actual path
 
-        if match := JDK_PATTERN.search(java_home):
-            system_jdk = match.group(1) # Get JDK version from 1st match group
+        system_jdk = get_jdk_version(java_home) # From release file or name
 
         if is_valid_jdk_version(system_jdk) and is_valid_jdk_path(java_home):
             return True # Version is numeric and meets the minimum requirement
@@ -98,6 +135,106 @@ def get_thonny_jdk_install() -> PurePath | Literal['']:
     return '' # No JDK with required version found in THONNY_USER_DIR
 
 
+def get_system_jdk() -> PurePath | Literal['']:
+    '''Look for the newest valid JDK in the standard system locations.'''
+    return find_newest_jdk(SYSTEM_JDK_FOLDERS)
+
+
+def get_shared_jdk() -> PurePath | Literal['']:
+    '''Look for the newest valid JDK in the configured shared JDK folder,
+    which may also be a JDK itself. Using it costs just a config write.'''
+
+    if not (shared := get_configured_path(JDK_SHARED_DIR_OPTION, JDK_SHARED_DIR_ENV)):
+        return '' # No shared JDK folder configured
+
+    if is_valid_jdk_version(read_release_version(shared)) and is_valid_jdk_path(shared):
+        return PurePath(shared)
+    return find_newest_jdk([shared])
+
+
+def install_stored_jdk() -> PurePath | Literal['']:
+    '''Materialize jdk-<version##> from the configured JDK store, if it holds
+    this platform's JDK: hard links only, no download nor extraction.'''
+
+    if not (store := get_configured_path(JDK_STORE_OPTION, JDK_STORE_ENV)):
+        return '' # No JDK store configured
+
+    try:
+        with extraction_folder(THONNY_USER_PATH) as temp_folder:
+            if not JdkStore(store).materialize(JDK_STORE_REF, temp_folder / JDK_DIR):
+                return '' # Store doesn't have it (yet)
+            move_into_place(temp_folder, JDK_PATH) # Atomic, like extraction
+    except OSError: return '' # Unreadable store: download instead
+
+    jdk_path = adjust_jdk_path(JDK_PATH)
+    return is_valid_jdk_path(jdk_path) and jdk_path or ''
+
+
+def get_configured_path(option: str, env_name: str) -> str:
+    '''A path from Thonny's configuration, else from the environment.'''
+    return WORKBENCH.get_option(option, '') or env.get(env_name, '')
+
+
+def find_newest_jdk(folders: Iterable[StrPath]) -> PurePath | Literal['']:
+    '''Return the newest valid JDK among the folders' subfolders.'''
+
+    found: list[tuple[int, PurePath]] = []
+
+    for folder in map(Path, folders):
+        try: candidates = list(folder.iterdir())
+        except OSError: continue # Missing or unreadable location
+
+        for candidate in candidates:
+            # SDKMAN's macOS JDKs skip the Contents/Home bundle layout:
+            is_home = Path(candidate, 'release').is_file()
+            jdk_path = is_home and PurePath(candidate) or adjust_jdk_path(candidate)
+            version = read_release_version(jdk_path) # Folder names can lie
+            if is_valid_jdk_version(version) and is_valid_jdk_path(jdk_path):
+                found.append(( int(version), jdk_path ))
+
+    return max(found)[1] if found else '' # Highest version wins
+
+
+def get_jdk_version(jdk_path: StrPath) -> str:
+    '''JDK major version from its release file, else from its folder name.'''
+    if version := read_release_version(jdk_path): return version
+    match = JDK_PATTERN.search(str(jdk_path))
+    return match and match.group(1) or 'TBD' # JDK version To-Be-Determined
+
+
+def read_release_version(jdk_path: StrPath) -> str:
+    '''Parse the major version out of the JDK's release file, if it has one.'''
+    try: release = Path(jdk_path, 'release').read_text(errors='replace')
+    except OSError: return ''
+    match = RELEASE_VERSION.search(release)
+    return match and match.group(1) or ''
+
+
+def get_probed_jdk() -> PurePath | Literal['']:
+    '''Return the JDK remembered by save_jdk_probe() if it hasn't changed
+    since (same release file mtime), without scanning any folder.'''
+
+    try:
+        probe = json.loads(JDK_PROBE_PATH.read_text())
+        jdk_path, version, mtime = probe['path'], probe['version'], probe['mtime']
+        if Path(jdk_path, 'release').stat().st_mtime != mtime: return ''
+    except (OSError, ValueError, KeyError, TypeError): return ''
+
+    if is_valid_jdk_version(version) and is_valid_jdk_path(jdk_path):
+        return PurePath(jdk_path)
+    return ''
+
+
+def save_jdk_probe(jdk_path: StrPath) -> None:
+    '''Remember a valid JDK's path, version and release file mtime.'''
+
+    try:
+        mtime = Path(jdk_path, 'release').stat().st_mtime
+        probe = dict(path=str(jdk_path), version=get_jdk_version(jdk_path), mtime=mtime)
+        JDK_PROBE_PATH.write_text(json.dumps(probe))
+    except OSError: pass # No release file or read-only folder: scan next time
+
+
 def set_java_home(jdk_path: StrPath) -> None:
     '''Add JDK path to config file (tools > options > general > env vars).'''
 
@@ -160,9 +297,9 @@ def get_all_thonny_folders() -> list[str]:
 class JdkDialog(ui_utils.CommonDialog):
     '''User-facing dialog prompting install of required JDK for py5 sketches.
     - Presents user with option to proceed or cancel the JDK installation.
-    - Displays a horizontal indeterminate-sized progress bar during download.
+    - Displays a progress bar with download speed and ETA during download.
     - Launches a background thread to handle installation tasks.
-    - Shows a success message when installation is complete.'''
+    - Shows a success (or error) message when installation is complete.'''
 
     _TITLE = tr('Install JDK ' + DOWNLOAD_JDK + ' for py5')
 
@@ -170,6 +307,15 @@ class JdkDialog(ui_utils.CommonDialog):
 
     _OK, _CANCEL, _DONE = map(tr, ('Proceed', 'Cancel', 'JDK done'))
 
+    _FAILED = tr('JDK download failed')
+
+    _STAGES = dict(
+        connecting=tr('Connecting...'),
+        reconnecting=tr('Connection lost, resuming...'),
+        verifying=tr('Verifying checksum...'),
+        extracting=tr('Extracting...'),
+        storing=tr('Adding to the JDK store...'))
+
     _MSG = 'JDK ' + DOWNLOAD_JDK + tr(' extracted to ') + THONNY_USER_DIR + tr(
         '\n\nYou can now run py5 sketches.')
 
@@ -177,6 +323,10 @@ class JdkDialog(ui_utils.CommonDialog):
         "Thonny requires at least JDK " + VERSION_JDK + " to run py5 sketches. "
         "It'll need to download about 180 MB.")
 
+    _INSTALL_LOCAL_JDK = tr(
+        "Thonny requires at least JDK " + VERSION_JDK + " to run py5 sketches. "
+        "It'll be installed from:\n")
+
     _PROGRESS_BAR_Y_PADDING = 0, 15
 
     def __init__(self, master=WORKBENCH, skip_diag_attribs=False, **kw):
@@ -193,8 +343,10 @@ class JdkDialog(ui_utils.CommonDialog):
         main_frame.rowconfigure(0, weight=1)
         main_frame.columnconfigure(0, weight=1)
 
-        # Display install message:
-        message_label = ttk.Label(main_frame, text=self._INSTALL_JDK)
+        # Display install message (mentioning a configured local archive):
+        archive = self.archive = get_configured_path(JDK_ARCHIVE_OPTION, JDK_ARCHIVE_ENV)
+        message = archive and self._INSTALL_LOCAL_JDK + archive or self._INSTALL_JDK
+        message_label = ttk.Label(main_frame, text=message)
         message_label.grid(pady=0, columnspan=2)
 
         # OK proceed button:
@@ -223,8 +375,9 @@ class JdkDialog(ui_utils.CommonDialog):
         if self.ok_button: self.ok_button.destroy()
         if self.cancel_button: self.cancel_button.destroy()
 
-        # Progress bar label:
-        dl_label = ttk.Label(self.main_frame, text=self._PROGRESS)
+        # Progress bar label (2nd line shows speed & ETA):
+        dl_label = self.dl_label = ttk.Label(
+            self.main_frame, text=self._PROGRESS + '\n', justify=tk.CENTER)
         dl_label.grid(row=1, columnspan=2, pady=self._PROGRESS_BAR_Y_PADDING)
 
         # Progress bar:
@@ -238,17 +391,20 @@ class JdkDialog(ui_utils.CommonDialog):
         # Start progress bar animation + download thread:
         if self.main_frame: self.main_frame.tkraise()
 
-        download_thread = DownloadJDK()
+        store = get_configured_path(JDK_STORE_OPTION, JDK_STORE_ENV)
+        download_thread = DownloadJDK(self.archive, store)
         download_thread.start()
         progress_bar.start(20)
 
         self._monitor(download_thread, progress_bar)
 
 
-    def _monitor(self, download: Thread, progress: ttk.Progressbar) -> None:
-        '''Animate progress bar while JDK installs and extracts.'''
+    def _monitor(self, download: 'DownloadJDK', progress: ttk.Progressbar) -> None:
+        '''Update progress bar while JDK downloads, then animate it while
+        the archive is verified and extracted.'''
 
         if download.is_alive():
+            self._show_progress(download.progress, progress)
             self.after(100, lambda: self._monitor(download, progress))
             return
 
@@ -256,36 +412,79 @@ class JdkDialog(ui_utils.CommonDialog):
         progress.stop()
         self._close()
 
-        showinfo(self._DONE, self._MSG, parent=WORKBENCH)
+        if download.error:
+            showerror(self._FAILED, str(download.error), parent=WORKBENCH)
+        else: showinfo(self._DONE, self._MSG, parent=WORKBENCH)
+
+
+    def _show_progress(self, info: DownloadProgress, progress: ttk.Progressbar) -> None:
+        '''Reflect the downloader's state in the progress bar and its label.'''
+
+        downloading = info.stage == 'downloading' and info.total
+        mode = downloading and 'determinate' or 'indeterminate'
+
+        if str(progress['mode']) != mode: # Switch between bar styles once
+            progress.stop()
+            progress.configure(mode=mode, maximum=1.0, value=0)
+            if not downloading: progress.start(20)
+
+        if downloading: progress['value'] = info.fraction
+        status = downloading and info.describe() or self._STAGES.get(info.stage, '')
+        self.dl_label['text'] = self._PROGRESS + '\n' + status
 
 
     def _close(self) -> None:
         '''Fully shutdown the JdkDialog instance.'''
         self.destroy()
         self.main_frame = self.ok_button = self.cancel_button = None
+        self.dl_label = None
 
 
 
 class DownloadJDK(Thread):
     '''Background thread for downloading & installing JDK into Thonny's folder.
     - Removes any preexisting JDK folders matching the expected version.
-    - Downloads and extracts the required JDK version.
-    - Renames the downloaded folder to the expected format.
+    - Downloads (resumably) and verifies the required JDK version's archive.
+    - Extracts it while downloading, then moves it to the expected folder.
+    - Adds it to the JDK store (if configured) for other Thonny user folders.
     - Sets JAVA_HOME on Thonny configuration.'''
 
+    def __init__(self, archive: StrPath = '', store: StrPath = '') -> None:
+        super().__init__(daemon=True)
+        self.archive = archive # Local JDK archive to use instead of downloading
+        self.store = store # JDK store to add the installed JDK to
+        self.progress = DownloadProgress() # Polled by JdkDialog
+        self.error: Exception | None = None # Reported by JdkDialog
+
+
     def run(self) -> None:
         '''Download and setup JDK (installs to Thonny's user directory)'''
 
+        try: self.install()
+        except Exception as e: self.error = e # Shown once the thread ends
+
+
+    def install(self) -> None:
         # Delete existing Thonny's JDK subfolders matching jdk-<version##>:
         self.process_match_jdk_dirs(shutil.rmtree)
 
-        # Download and extract JDK subfolder into Thonny's user folder:
-        jdk.install(DOWNLOAD_JDK, path=THONNY_USER_DIR)
+        # Install from a local archive, if one was configured (labs)...
+        if self.archive:
+            install_local_archive(Path(self.archive), JDK_PATH, self.progress)
 
-        # Rename extracted Thonny's JDK subfolder to jdk-<version##>:
-        self.process_match_jdk_dirs(self.rename_folder, True)
+        # ... else download JDK archive into Thonny's user folder (a partial
+        # download left by an earlier attempt is resumed, not restarted) and
+        # extract it as it arrives; jdk-<version##> only appears once done:
+        else: download_and_install(get_jdk_archive(DOWNLOAD_JDK), JDK_PATH, self.progress)
 
-        set_java_home(JDK_PATH) # Add a Thonny's JAVA_HOME entry for it
+        # Share its files with other Thonny user folders through the store:
+        if self.store:
+            self.progress.stage = 'storing'
+            JdkStore(self.store).ingest(JDK_PATH, JDK_STORE_REF)
+
+        jdk_path = adjust_jdk_path(JDK_PATH)
+        save_jdk_probe(jdk_path) # Next toggles won't need to look for it
+        set_java_home(jdk_path) # Add a Thonny's JAVA_HOME entry for it
 
 
     @staticmethod
@@ -303,8 +502,3 @@ class DownloadJDK(Thread):
         '''Find all subfolder paths within Thonny's user folder'''
         return filter(Path.is_dir, THONNY_USER_PATH.iterdir())
 
-
-    @staticmethod
-    def rename_folder(path: StrPath) -> None:
-        '''Rename a JDK subfolder to the expected jdk-<version##> format.'''
-        rename(path, JDK_PATH)
@@ -0,0 +1,377 @@
+'''thonny-py5mode JDK downloader.
+Streams the JDK archive in chunks, resumes interrupted downloads with HTTP
+range requests, reports speed & ETA, and verifies the archive's checksum.
+Tarballs are extracted while they download, into a temporary folder that is
+only renamed into place once the archive checked out.'''
+
+import hashlib, io, json, shutil, tarfile, tempfile, time
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.client import HTTPException
+from os import fstat, replace
+from pathlib import Path
+from threading import Event, Thread
+from typing import Callable
+from urllib import request
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+
+import jdk
+
+ADOPTIUM_ASSETS_URL = 'https://api.adoptium.net/v3/assets/latest/{}/hotspot'
+'''Adoptium API endpoint listing the latest release assets of a JDK version.'''
+
+USER_AGENT = 'Mozilla/5.0'
+'''Same User-Agent install-jdk uses (some mirrors reject urllib's default).'''
+
+CHUNK_SIZE = 256 * 1024
+'''Bytes read from the connection (and hashed) per iteration.'''
+
+RETRIES, RETRY_DELAY = 5, 2.0
+'''Attempts to resume a dropped download, and seconds between them.'''
+
+TIMEOUT = 30
+'''Seconds without data before a connection is considered dropped.'''
+
+SPEED_WINDOW = 3.0
+'''Seconds of recent transfer history used to compute speed and ETA.'''
+
+STREAMABLE = '.tar.gz', '.tgz'
+'''Archive suffixes that can be extracted while they're still downloading
+(zip archives keep their table of contents at the end).'''
+
+TEMP_PREFIX = '.py5mode-tmp-'
+'''Temporary extraction folder prefix, on purpose not matching JDK_PATTERN.'''
+
+
+class JdkDownloadError(Exception):
+    '''Raised when the JDK archive can't be found, fetched or verified.'''
+
+
+@dataclass(frozen=True)
+class JdkArchive:
+    '''Where to get a JDK archive, and what it should look like.'''
+    name: str
+    url: str
+    size: int
+    sha256: str
+
+
+class DownloadProgress:
+    '''Download state shared between the downloader thread and the dialog.
+    Plain attribute reads/writes, so the Tk side can poll it safely.'''
+
+    def __init__(self) -> None:
+        self.done = self.total = 0 # Bytes on disk / expected archive size
+        self.stage = 'connecting' # connecting, downloading, verifying...
+        self._history: list[tuple[float, int]] = [] # (time, done) samples
+        self.listeners: list[Callable[[], None]] = [] # Told about new data
+
+    def update(self, done: int) -> None:
+        '''Record the number of bytes downloaded so far.'''
+        now = time.monotonic()
+        self.done = done
+        self._history.append((now, done))
+        # Drop samples older than the speed window (keeping at least 2):
+        while len(self._history) > 2 and now - self._history[0][0] > SPEED_WINDOW:
+            self._history.pop(0)
+        for listener in self.listeners: listener()
+
+    @property
+    def fraction(self) -> float:
+        return self.done / self.total if self.total else 0.0
+
+    @property
+    def speed(self) -> float:
+        '''Bytes per second over the last few seconds.'''
+        history = self._history[:] # Snapshot, the downloader keeps appending
+        if len(history) < 2: return 0.0
+        (start, start_done), (end, end_done) = history[0], history[-1]
+        return (end_done - start_done) / (end - start) if end > start else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        '''Seconds left at the current speed, None if unknown.'''
+        speed = self.speed
+        if not speed or not self.total: return None
+        return (self.total - self.done) / speed
+
+    def describe(self) -> str:
+        '''Human-readable progress, e.g. "42.0 of 180.3 MB, 5.1 MB/s, 0:27 left".'''
+        mb = 1024 * 1024
+        text = f'{self.done / mb:.1f} of {self.total / mb:.1f} MB'
+        if speed := self.speed: text += f', {speed / mb:.1f} MB/s'
+        if (eta := self.eta) is not None:
+            text += ', {}:{:02d} left'.format(*divmod(round(eta), 60))
+        return text
+
+
+def get_jdk_archive(version: str) -> JdkArchive:
+    '''Ask the Adoptium API for the current platform's JDK archive details.'''
+
+    arch = jdk.ARCH
+    # Same edge case install-jdk handles: Apple Silicon reports "arm":
+    if jdk.OS is jdk.OperatingSystem.MAC and arch is jdk.Architecture.ARM:
+        arch = jdk.Architecture.AARCH64
+
+    query = urlencode(dict(
+        architecture=str(arch), image_type='jdk', os=str(jdk.OS),
+        vendor='eclipse'))
+    url = ADOPTIUM_ASSETS_URL.format(version) + '?' + query
+
+    try:
+        with request.urlopen(_request(url), timeout=TIMEOUT) as response:
+            releases = json.load(response)
+        package = releases[0]['binary']['package']
+        return JdkArchive(
+            package['name'], package['link'], package['size'], package['checksum'])
+    except (OSError, ValueError, LookupError, TypeError) as e:
+        raise JdkDownloadError(f'No JDK {version} archive found: {e}') from e
+
+
+def download_archive(
+    archive: JdkArchive, target: Path,
+    progress: DownloadProgress | None = None) -> Path:
+    '''Download the archive to target, resuming from target + ".part" if a
+    previous attempt left one behind, and verify its SHA-256 checksum.'''
+
+    progress = progress or DownloadProgress()
+    progress.total = archive.size
+    part = target.with_name(target.name + '.part')
+
+    for attempt in range(RETRIES + 1):
+        try:
+            _fetch(archive.url, part, progress)
+            break
+        except (OSError, HTTPException) as e: # Dropped connections included
+            if isinstance(e, HTTPError) and e.code < 500:
+                raise JdkDownloadError(e) from e # Won't get better by retrying
+            if attempt == RETRIES: raise JdkDownloadError(e) from e
+            progress.stage = 'reconnecting'
+            time.sleep(RETRY_DELAY)
+
+    progress.stage = 'verifying'
+    if (checksum := file_sha256(part)) != archive.sha256.lower():
+        part.unlink() # Corrupted: resuming it would never succeed
+        raise JdkDownloadError(
+            f'Checksum mismatch for {archive.name}: {checksum}')
+
+    part.replace(target)
+    return target
+
+
+def _fetch(url: str, part: Path, progress: DownloadProgress) -> None:
+    '''Stream url into part, continuing after the bytes it already holds.'''
+
+    done = part.stat().st_size if part.exists() else 0
+    req = _request(url)
+    if done: req.add_header('Range', f'bytes={done}-')
+
+    try:
+        response = request.urlopen(req, timeout=TIMEOUT)
+    except HTTPError as e:
+        if e.code != 416: raise
+        return # Range not satisfiable: nothing left to fetch
+
+    with response:
+        if done and response.status != 206:
+            done = 0 # Server ignored the range request: start over
+
+        total = response.headers.get('Content-Length')
+        if total and not progress.total: progress.total = done + int(total)
+
+        progress.stage = 'downloading'
+        progress.update(done)
+
+        with open(part, 'ab' if done else 'wb') as file:
+            while chunk := response.read(CHUNK_SIZE):
+                file.write(chunk)
+                done += len(chunk)
+                progress.update(done)
+
+    if progress.total and done < progress.total: # Closed before the end
+        raise ConnectionError(f'Connection closed at {done} bytes')
+
+
+class GrowingFileReader(io.RawIOBase):
+    '''Reads a file from the start while another thread is appending to it.
+    Waits for more data instead of reporting EOF until finish() is called.'''
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._file = None
+        self._position = 0
+        self._finished = self._aborted = False
+        self._more = Event() # Set whenever the writer may have added data
+
+    def readable(self) -> bool: return True
+
+    def notify(self) -> None: self._more.set()
+
+    def finish(self) -> None:
+        self._finished = True; self._more.set()
+
+    def abort(self) -> None:
+        self._aborted = True; self._more.set()
+
+    def readinto(self, buffer) -> int:
+        while True:
+            if self._aborted: raise EOFError('Download aborted')
+            finished = self._finished # Read before trying, not after
+
+            if self._file is None and self.path.exists():
+                self._file = open(self.path, 'rb')
+
+            if self._file:
+                if fstat(self._file.fileno()).st_size < self._position:
+                    # The downloader started over, what was read is stale:
+                    raise EOFError('Download restarted')
+                if count := self._file.readinto(buffer):
+                    self._position += count
+                    return count
+
+            if finished: return 0 # True end of file
+            self._more.wait(0.5)
+            self._more.clear()
+
+    def close(self) -> None:
+        if self._file: self._file.close()
+        super().close()
+
+
+def extract_tar_stream(stream: io.RawIOBase, folder: Path) -> None:
+    '''Extract a gzipped tar stream member by member, as bytes arrive.'''
+
+    with tarfile.open(fileobj=stream, mode='r|gz') as tar:
+        for member in tar:
+            if not Path(folder, member.name).resolve().is_relative_to(folder):
+                raise tarfile.TarError(f'Unsafe path in archive: {member.name}')
+            if hasattr(tarfile, 'data_filter'): # Python 3.12+ and backports
+                tar.extract(member, folder, filter='data')
+            else: tar.extract(member, folder)
+
+
+def extract_archive(archive_path: Path, folder: Path) -> None:
+    '''Extract a fully downloaded archive with install-jdk's extractor.'''
+    archive_file = str(archive_path)
+    extension = jdk.extractor.get_compressed_file_ext(archive_file)
+    jdk.extractor.extract_files(archive_file, extension, str(folder))
+
+
+def download_and_install(
+    archive: JdkArchive, destination: Path,
+    progress: DownloadProgress | None = None) -> Path:
+    '''Download the archive next to destination, extract it into a temporary
+    folder (while downloading, if possible) and, once its checksum matched,
+    rename the extracted JDK folder to destination.'''
+
+    progress = progress or DownloadProgress()
+    archive_path = destination.parent / archive.name
+
+    with extraction_folder(destination.parent) as temp_folder:
+        extracted = archive.name.endswith(STREAMABLE) and _download_extracting(
+            archive, archive_path, temp_folder, progress)
+
+        if not extracted: # Zip archive, or streaming didn't work out
+            if not archive_path.exists():
+                download_archive(archive, archive_path, progress)
+            progress.stage = 'extracting'
+            shutil.rmtree(temp_folder); temp_folder.mkdir()
+            extract_archive(archive_path, temp_folder)
+
+        archive_path.unlink()
+        return move_into_place(temp_folder, destination)
+
+
+def install_local_archive(
+    archive_path: Path, destination: Path,
+    progress: DownloadProgress | None = None) -> Path:
+    '''Install a JDK archive already on disk (e.g. on a network share) the
+    same way as a downloaded one. If Adoptium's "<archive>.sha256.txt" sits
+    next to it, the archive is verified first.'''
+
+    progress = progress or DownloadProgress()
+    checksum_path = archive_path.with_name(archive_path.name + '.sha256.txt')
+
+    if checksum_path.is_file():
+        progress.stage = 'verifying'
+        expected = checksum_path.read_text().split()[0].lower()
+        if file_sha256(archive_path) != expected:
+            raise JdkDownloadError(f'Checksum mismatch for {archive_path}')
+
+    progress.stage = 'extracting'
+    with extraction_folder(destination.parent) as temp_folder:
+        extract_archive(archive_path, temp_folder)
+        return move_into_place(temp_folder, destination)
+
+
+@contextmanager
+def extraction_folder(parent: Path) -> Iterator[Path]:
+    '''A temporary folder in parent, removed afterwards whatever happens.'''
+
+    for leftover in parent.glob(TEMP_PREFIX + '*'): # From a killed Thonny
+        shutil.rmtree(leftover, ignore_errors=True)
+    temp_folder = Path(tempfile.mkdtemp(prefix=TEMP_PREFIX, dir=parent)).resolve()
+
+    try:
+        yield temp_folder
+    finally:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+
+
+def move_into_place(temp_folder: Path, destination: Path) -> Path:
+    '''Rename the single jdk-21.x.y+z folder an archive holds.'''
+    jdk_folder, = temp_folder.iterdir()
+    replace(jdk_folder, destination) # Atomic: no half-extracted JDK
+    return destination
+
+
+def _download_extracting(
+    archive: JdkArchive, archive_path: Path, folder: Path,
+    progress: DownloadProgress) -> bool:
+    '''Download archive while a helper thread extracts what has arrived.
+    Return False if the extraction couldn't keep up with the download
+    (e.g. it restarted), leaving the archive for a regular extraction.'''
+
+    part = archive_path.with_name(archive_path.name + '.part')
+    reader = GrowingFileReader(part)
+    errors: list[Exception] = []
+
+    def extract() -> None:
+        try:
+            extract_tar_stream(reader, folder)
+        except Exception as e:
+            errors.append(e)
+
+    extractor = Thread(target=extract, daemon=True)
+    extractor.start()
+    progress.listeners.append(reader.notify)
+
+    try:
+        download_archive(archive, archive_path, progress)
+    except BaseException:
+        reader.abort()
+        raise
+    else:
+        progress.stage = 'extracting' # Whatever is left of it
+    finally:
+        progress.listeners.remove(reader.notify)
+        reader.finish()
+        # Also after a failed download: the caller removes the folder next
+        extractor.join()
+        reader.close()
+    return not errors
+
+
+def file_sha256(path: Path) -> str:
+    '''Hex SHA-256 digest of a file, read in chunks.'''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        while chunk := file.read(CHUNK_SIZE): digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _request(url: str) -> request.Request:
+    return request.Request(url, headers={'User-Agent': USER_AGENT})
@@ -0,0 +1,146 @@
+'''thonny-py5mode content-addressed JDK store.
+Keeps one copy of each JDK file, named after its SHA-256, so every Thonny
+user folder (one per Thonny version or virtualenv) can get its jdk-21 folder
+as hard links (or reflinks) to the store instead of a full extraction.'''
+
+import json, shutil, stat
+
+from hashlib import sha256
+from os import PathLike, chmod, link, readlink, symlink, walk
+from pathlib import Path
+
+from typing import TypeAlias
+
+from .jdk_download import file_sha256
+
+StrPath: TypeAlias = str | PathLike[str]
+'''A type representing string-based filesystem paths.'''
+
+FICLONE = 0x40049409
+'''Linux ioctl request cloning a file's extents (btrfs, XFS reflinks).'''
+
+
+class JdkStore:
+    '''Store layout:
+    - objects/<2 hex>/<sha256>-<mode>: one file per distinct content & mode
+      (hard links share permission bits, so the mode is part of the key).
+    - trees/<sha256>.json: a JDK folder listing, named after its own hash.
+    - refs/<name>: id of the tree installed under a name like jdk-21-linux-x64.'''
+
+    def __init__(self, root: StrPath) -> None:
+        self.root = Path(root)
+        self.objects, self.trees, self.refs = (
+            self.root / folder for folder in ('objects', 'trees', 'refs'))
+
+
+    def ingest(self, folder: StrPath, ref: str) -> str:
+        '''Add a JDK folder to the store and point ref to it. Its files are
+        replaced by links to the stored copies, deduplicating them too.'''
+
+        folder, entries = Path(folder), []
+
+        for parent, dirs, files in walk(folder):
+            parent = Path(parent)
+            for name in sorted(dirs):
+                path = parent / name
+                if path.is_symlink(): # Listed as a dir, but it's a link
+                    entries.append(( self._relative(path, folder), 'l', readlink(path), 0 ))
+                else: entries.append(( self._relative(path, folder), 'd', '', 0 ))
+
+            for name in sorted(files):
+                path = parent / name
+                if path.is_symlink():
+                    entries.append(( self._relative(path, folder), 'l', readlink(path), 0 ))
+                    continue
+                mode = stat.S_IMODE(path.stat().st_mode)
+                digest = self._add_object(path, mode)
+                entries.append(( self._relative(path, folder), 'f', digest, mode ))
+
+        tree = json.dumps(sorted(entries), separators=(',', ':')).encode()
+        tree_id = sha256(tree).hexdigest()
+        self._write(self.trees / (tree_id + '.json'), tree)
+        self._write(self.refs / ref, tree_id.encode())
+        return tree_id
+
+
+    def materialize(self, ref: str, destination: StrPath) -> bool:
+        '''Recreate the JDK folder ref points to at destination, linking
+        its files to the store. Return False if ref or any object is missing.'''
+
+        try:
+            tree_id = (self.refs / ref).read_text().strip()
+            entries = json.loads((self.trees / (tree_id + '.json')).read_text())
+        except (OSError, ValueError): return False
+
+        objects = [self._object_path(digest, mode)
+                   for _, kind, digest, mode in entries if kind == 'f']
+        if not all(map(Path.is_file, objects)): return False # Store was pruned
+
+        destination = Path(destination)
+        destination.mkdir(parents=True)
+        for relative, kind, target, mode in entries: # Sorted: parents first
+            path = destination / relative
+            if kind == 'd': path.mkdir()
+            elif kind == 'l': symlink(target, path)
+            else: link_or_copy(self._object_path(target, mode), path)
+        return True
+
+
+    def _add_object(self, path: Path, mode: int) -> str:
+        '''Move a file's content into objects/ (unless an identical one is
+        already there) and make the file a link to the stored object.'''
+
+        digest = file_sha256(path)
+        stored = self._object_path(digest, mode)
+
+        if not stored.exists():
+            stored.parent.mkdir(parents=True, exist_ok=True)
+            link_or_copy(path, stored)
+        elif not stored.samefile(path): # Duplicate content: share it
+            path.unlink()
+            link_or_copy(stored, path)
+        return digest
+
+
+    def _object_path(self, digest: str, mode: int) -> Path:
+        return self.objects / digest[:2] / f'{digest}-{mode:o}'
+
+
+    @staticmethod
+    def _relative(path: Path, folder: Path) -> str:
+        return path.relative_to(folder).as_posix()
+
+
+    @staticmethod
+    def _write(path: Path, data: bytes) -> None:
+        '''Write a small file atomically (readers never see it half done).'''
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(path.name + '.tmp')
+        temp.write_bytes(data)
+        temp.replace(path)
+
+
+def link_or_copy(source: Path, target: Path) -> None:
+    '''Hard-link source to target; across filesystems, try a reflink (a
+    copy-on-write clone) and, as a last resort, a plain copy.'''
+
+    try: return link(source, target)
+    except OSError: pass # Cross-device, or links not supported
+
+    try: return reflink(source, target)
+    except OSError: pass
+
+    shutil.copyfile(source, target)
+    chmod(target, stat.S_IMODE(source.stat().st_mode))
+
+
+def reflink(source: Path, target: Path) -> None:
+    '''Clone source's data blocks into target (Linux btrfs/XFS only).'''
+
+    try: import fcntl
+    except ImportError: raise OSError('No reflinks on this platform') from None
+
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        try: fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError: target.unlink(); raise
+    chmod(target, stat.S_IMODE(source.stat().st_mode))
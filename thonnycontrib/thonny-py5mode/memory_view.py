@@ -0,0 +1,206 @@
+"""py5 memory view
+shows the allocations a sketch run with py5 > Track sketch memory reports
+(see backend > py5_memory.py) once per second, double-clicking one of the
+lines opens it in the editor
+"""
+
+import collections
+import os
+import tkinter as tk
+from tkinter import ttk
+
+from thonny import get_workbench
+from thonny.languages import tr
+
+# the backend event carrying a memory report
+MEMORY_EVENT = "Py5Memory"
+# traced memory kept for the growth graph, 2 minutes at 1 report per second
+MEMORY_HISTORY = 120
+CANVAS_HEIGHT = 80
+LINE_COLOR = "#d9822b"
+
+
+def show_size(size: float) -> str:
+    """a number of bytes in B, KB, MB or GB"""
+    if abs(size) < 1024:
+        return f"{size:.0f} B"
+    for unit in ("KB", "MB", "GB"):
+        size /= 1024
+        if abs(size) < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}"
+
+
+# column id, heading, width, how to show the value
+COLUMNS = (
+    ("location", tr("Location"), 140, str),
+    ("code", tr("Code"), 220, str),
+    ("frame_bytes", tr("Allocated by a frame"), 120, show_size),
+    ("bytes_per_frame", tr("Kept per frame"), 100, show_size),
+    ("blocks_per_frame", tr("Blocks per frame"), 100, "{:.1f}".format),
+    ("size", tr("Alive"), 80, show_size),
+    ("count", tr("Blocks alive"), 90, str),
+)
+
+
+class MemoryView(ttk.Frame):
+    """traced memory and its growth, what each frame allocates at its peak
+    and keeps, garbage collections, and the source lines that allocated
+    memory in a sampled frame or kept some since the previous report"""
+
+    def __init__(self, master):
+        super().__init__(master, padding=5)
+        self.columnconfigure(1, weight=1)
+        self.columnconfigure(3, weight=1)
+        self.rowconfigure(4, weight=1)
+        self.history = collections.deque(maxlen=MEMORY_HISTORY)
+        self.last_report = None
+        self.rows = []
+        self.values = {}
+        labels = (
+            ("current", tr("Traced memory")),
+            ("peak", tr("Peak")),
+            ("growth", tr("Growth")),
+            ("frame_peak", tr("Allocated per frame")),
+            ("kept_per_frame", tr("Kept per frame")),
+            ("gc", tr("Garbage collections")),
+        )
+        for i, (key, label) in enumerate(labels):
+            row, column = i % 3, i // 3 * 2
+            ttk.Label(self, text=label).grid(row=row, column=column, sticky="w")
+            self.values[key] = ttk.Label(self, text="-")
+            self.values[key].grid(
+                row=row, column=column + 1, sticky="w", padx=(10, 10)
+            )
+
+        self.graph = tk.Canvas(self, height=CANVAS_HEIGHT, highlightthickness=0)
+        self.graph.grid(row=3, column=0, columnspan=4, sticky="ew")
+
+        table = ttk.Frame(self)
+        table.grid(row=4, column=0, columnspan=4, sticky="nsew")
+        table.columnconfigure(0, weight=1)
+        table.rowconfigure(1, weight=1)
+        self.only_sketch = tk.BooleanVar(value=True)
+        ttk.Checkbutton(
+            table,
+            text=tr("Only the sketch's lines"),
+            variable=self.only_sketch,
+            command=self.show_rows,
+        ).grid(row=0, column=0, sticky="w")
+        # what the table shows, or that it waits for frames
+        self.table_note = ttk.Label(table, text="")
+        self.table_note.grid(row=0, column=0, columnspan=2, sticky="e")
+        self.tree = ttk.Treeview(
+            table, columns=[column[0] for column in COLUMNS], show="headings"
+        )
+        for column, heading, width, _ in COLUMNS:
+            anchor = "w" if column in ("location", "code") else "e"
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, anchor=anchor)
+        self.tree.grid(row=1, column=0, sticky="nsew")
+        scrollbar = ttk.Scrollbar(table, orient="vertical", command=self.tree.yview)
+        scrollbar.grid(row=1, column=1, sticky="ns")
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.bind("<Double-Button-1>", self.open_source, True)
+
+        get_workbench().bind("ToplevelResponse", self.handle_run_end, True)
+        self.bind("<Map>", self.handle_map, True)
+
+    def handle_report(self, msg) -> None:
+        if msg.baseline:
+            self.history.clear()  # a new run, this is what setup() kept
+        self.history.append((msg.elapsed, msg.current))
+        self.last_report = msg
+        # while hidden, the history is kept and drawing waits until shown
+        if self.winfo_ismapped():
+            self.show_report(msg)
+
+    def handle_map(self, event) -> None:
+        if self.last_report:
+            self.show_report(self.last_report)
+
+    def handle_run_end(self, msg) -> None:
+        if self.last_report:
+            current = show_size(self.last_report.current)
+            self.values["current"].configure(text=tr("%s (stopped)") % current)
+
+    def show_report(self, msg) -> None:
+        self.values["current"].configure(text=show_size(msg.current))
+        self.values["peak"].configure(text=show_size(msg.peak))
+        (start, first), (end, last) = self.history[0], self.history[-1]
+        if end > start:
+            growth = show_size((last - first) / (end - start))
+            self.values["growth"].configure(text=tr("%s per second") % growth)
+        if msg.baseline:
+            # what the sketch's code and setup() built, no frames yet
+            self.values["frame_peak"].configure(text="-")
+            self.values["kept_per_frame"].configure(text="-")
+            self.table_note.configure(text=tr("Baseline taken, waiting for frames"))
+        else:
+            self.values["frame_peak"].configure(
+                text=f"{show_size(msg.frame_peak)} ({tr('max')} "
+                f"{show_size(msg.frame_peak_max)})"
+            )
+            self.values["kept_per_frame"].configure(
+                text=show_size(msg.kept_per_frame)
+            )
+            self.table_note.configure(
+                text=tr("Lines that allocated or kept memory in the last second")
+            )
+        self.values["gc"].configure(
+            text=tr("%.1f per second, %.1f ms per second")
+            % (msg.gc_per_second, msg.gc_ms_per_second)
+        )
+        self.draw_graph()
+        self.show_rows()
+
+    def show_rows(self) -> None:
+        if self.last_report is None:
+            return
+        rows = self.last_report.rows
+        if self.only_sketch.get():
+            rows = [row for row in rows if row["in_sketch"]]
+        self.rows = [
+            dict(row, location=f"{os.path.basename(row['filename'])}:{row['line']}")
+            for row in rows
+        ]
+        self.tree.delete(*self.tree.get_children())
+        for i, row in enumerate(self.rows):
+            values = [show(row[column]) for column, _, _, show in COLUMNS]
+            self.tree.insert("", "end", iid=str(i), values=values)
+
+    def draw_graph(self) -> None:
+        """traced memory over the last MEMORY_HISTORY reports"""
+        canvas = self.graph
+        canvas.delete("all")
+        width = canvas.winfo_width()
+        top = max(current for _, current in self.history)
+        if len(self.history) < 2 or not top:
+            return
+        step = width / (MEMORY_HISTORY - 1)
+        points = []
+        for i, (_, current) in enumerate(self.history):
+            y = CANVAS_HEIGHT - 2 - (CANVAS_HEIGHT - 16) * current / top
+            points += [i * step, y]
+        canvas.create_line(*points, fill=LINE_COLOR, width=2)
+        canvas.create_text(2, 2, text=show_size(top), anchor="nw")
+
+    def open_source(self, event) -> None:
+        """show the double-clicked line in the editor"""
+        item = self.tree.identify_row(event.y)
+        if not item:
+            return
+        row = self.rows[int(item)]
+        if os.path.isfile(row["filename"]):
+            notebook = get_workbench().get_editor_notebook()
+            notebook.show_file(row["filename"], row["line"])
+
+
+def show_memory_report(msg) -> None:
+    """bring up the view on a run's first report (thonny only creates views
+    when first shown) and pass it every report"""
+    if msg.baseline:
+        view = get_workbench().show_view("MemoryView", set_focus=False)
+    else:
+        view = get_workbench().get_view("MemoryView")
+    if view:
+        view.handle_report(msg)
@@ -0,0 +1,135 @@
+"""py5 profile view
+a sortable table of the functions a profiled sketch ran (see backend >
+py5_profiler.py), double-clicking a row opens its source line
+"""
+
+import os
+import tkinter as tk
+from tkinter import ttk
+
+from thonny import get_workbench
+from thonny.languages import tr
+
+# the backend event carrying the profile
+PROFILE_EVENT = "Py5Profile"
+# column id, heading, width, how to show the value
+COLUMNS = (
+    ("function", tr("Function"), 160, str),
+    ("location", tr("Location"), 180, str),
+    ("calls", tr("Calls"), 70, str),
+    ("per_frame_ms", tr("ms per frame"), 90, "{:.3f}".format),
+    ("cumulative_ms", tr("Cumulative ms"), 100, "{:.1f}".format),
+    ("total_ms", tr("Own ms"), 80, "{:.1f}".format),
+    ("per_call_ms", tr("ms per call"), 90, "{:.4f}".format),
+)
+NUMERIC_COLUMNS = (
+    "calls",
+    "per_frame_ms",
+    "cumulative_ms",
+    "total_ms",
+    "per_call_ms",
+)
+
+
+class ProfileView(ttk.Frame):
+    """cumulative and own time per function, for draw() (averaged per frame)
+    or setup(); click a heading to sort by it"""
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+        self.results = None
+        self.rows = []
+        self.sort_column, self.sort_descending = "cumulative_ms", True
+
+        bar = ttk.Frame(self, padding=(5, 3))
+        bar.grid(row=0, column=0, columnspan=2, sticky="ew")
+        self.phase = tk.StringVar(value="draw")
+        for phase in ("draw", "setup"):
+            ttk.Radiobutton(
+                bar,
+                text=phase + "()",
+                value=phase,
+                variable=self.phase,
+                command=self.show_rows,
+            ).pack(side="left")
+        self.only_sketch = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            bar,
+            text=tr("Only the sketch's functions"),
+            variable=self.only_sketch,
+            command=self.show_rows,
+        ).pack(side="left", padx=(10, 0))
+        self.summary = ttk.Label(bar, text=tr("Run py5 > Profile sketch"))
+        self.summary.pack(side="right")
+
+        self.tree = ttk.Treeview(
+            self, columns=[column[0] for column in COLUMNS], show="headings"
+        )
+        for column, heading, width, _ in COLUMNS:
+            anchor = "e" if column in NUMERIC_COLUMNS else "w"
+            self.tree.heading(
+                column, text=heading, command=lambda c=column: self.sort_by(c)
+            )
+            self.tree.column(column, width=width, anchor=anchor)
+        self.tree.grid(row=1, column=0, sticky="nsew")
+        scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        scrollbar.grid(row=1, column=1, sticky="ns")
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.bind("<Double-Button-1>", self.open_source, True)
+
+    def handle_profile(self, msg) -> None:
+        self.results = msg
+        self.summary.configure(
+            text=tr("%d frames in %.1f s") % (msg.frames, msg.seconds)
+        )
+        self.show_rows()
+
+    def sort_by(self, column: str) -> None:
+        """sort by column, or reverse the order if it already is"""
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            # numbers from the biggest, names alphabetically
+            self.sort_column = column
+            self.sort_descending = column in NUMERIC_COLUMNS
+        self.show_rows()
+
+    def show_rows(self) -> None:
+        if self.results is None:
+            return
+        rows = getattr(self.results, self.phase.get() + "_rows")
+        if self.only_sketch.get():
+            sketch_dir = os.path.join(self.results.sketch_dir, "")
+            rows = [row for row in rows if row["filename"].startswith(sketch_dir)]
+        rows = [
+            dict(row, location=f"{os.path.basename(row['filename'])}:{row['line']}")
+            for row in rows
+        ]
+        key = self.sort_column
+        rows.sort(key=lambda row: row[key], reverse=self.sort_descending)
+        self.rows = rows
+
+        self.tree.delete(*self.tree.get_children())
+        for i, row in enumerate(self.rows):
+            values = [show(row[column]) for column, _, _, show in COLUMNS]
+            self.tree.insert("", "end", iid=str(i), values=values)
+
+    def open_source(self, event) -> None:
+        """show the double-clicked function in the editor"""
+        item = self.tree.identify_row(event.y)
+        if not item:
+            return
+        row = self.rows[int(item)]
+        if os.path.isfile(row["filename"]):
+            notebook = get_workbench().get_editor_notebook()
+            notebook.show_file(row["filename"], row["line"])
+
+
+def show_profile(msg) -> None:
+    """bring up the view (thonny only creates it when first shown) and fill
+    it with the profile that just arrived"""
+    view = get_workbench().show_view("ProfileView", set_focus=False)
+    if view:
+        view.handle_profile(msg)
@@ -0,0 +1,122 @@
+"""py5 keywords for syntax highlighting
+py5_tools' reference is read once per py5 version, the keyword list and the
+highlighter pattern are cached as json in thonny's user directory
+"""
+
+import hashlib
+import json
+import pathlib
+import re
+import types
+from importlib import machinery, metadata, util
+
+from thonny import THONNY_USER_DIR, token_utils
+
+CACHE_PATH = pathlib.Path(THONNY_USER_DIR) / "py5mode_keywords.json"
+_keywords: list[str] | None = None
+
+
+def get_py5_version() -> str:
+    """return the installed py5 version, or an empty string if not found"""
+    try:
+        return metadata.version("py5")
+    except metadata.PackageNotFoundError:
+        return ""
+
+
+def load_py5_reference_names() -> list[str]:
+    """read every py5 name from py5_tools' reference.py"""
+    spec = util.find_spec("py5_tools")
+    # cannot use `dir(py5)` because of jvm check, hence direct loading
+    path = pathlib.Path(spec.submodule_search_locations[0]) / "reference.py"
+    loader = machinery.SourceFileLoader("py5_tools_reference", str(path))
+    module = types.ModuleType(loader.name)
+    loader.exec_module(module)
+    return list(module.PY5_ALL_STR)
+
+
+def words_to_regex(words: list[str]) -> str:
+    """build an alternation of words with common prefixes factored out,
+    so the regex engine never tries more than one branch per character"""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def node_to_regex(node: dict) -> str:
+        optional = "" in node
+        branches = [
+            re.escape(char) + node_to_regex(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+        if all(len(branch) == 1 for branch in branches) and len(branches) > 1:
+            pattern = "[" + "".join(branches) + "]"
+        elif len(branches) == 1 and len(branches[0]) == 1:
+            pattern = branches[0]
+        else:
+            pattern = "(?:" + "|".join(branches) + ")"
+        return pattern + "?" if optional else pattern
+
+    return node_to_regex(trie)
+
+
+def get_cache_key() -> dict:
+    """the cached data is valid for a given py5 version and builtin list"""
+    builtins = "\n".join(token_utils._builtinlist).encode()
+    return {
+        "py5": get_py5_version(),
+        "builtins": hashlib.sha1(builtins).hexdigest(),
+    }
+
+
+def read_cache() -> dict | None:
+    """return the cached keywords and pattern if they are still valid"""
+    try:
+        cache = json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+        if cache["key"] == get_cache_key():
+            return cache
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def build_cache() -> dict:
+    """read the py5 reference and build the highlighter pattern"""
+    keywords = load_py5_reference_names()
+    names = sorted(set(token_utils._builtinlist + keywords))
+    builtin = token_utils.matches_any("builtin", [words_to_regex(names)])
+    cache = {
+        "key": get_cache_key(),
+        "keywords": keywords,
+        "builtin_pattern": r'([^.\'"\\#]\b|^)' + builtin + r"\b",
+    }
+    try:
+        CACHE_PATH.write_text(json.dumps(cache), encoding="utf-8")
+    except OSError:
+        pass  # a read-only user dir only costs rebuilding on next start
+    return cache
+
+
+def get_cache() -> dict:
+    return read_cache() or build_cache()
+
+
+def get_py5_keywords() -> list[str]:
+    """return every py5 name (functions, constants, dynamic variables)"""
+    global _keywords
+    if _keywords is None:
+        _keywords = get_cache()["keywords"]
+    return _keywords
+
+
+def get_builtin_pattern() -> str:
+    """return a replacement for token_utils.BUILTIN including py5 names"""
+    cache = get_cache()
+    global _keywords
+    _keywords = cache["keywords"]
+    return cache["builtin_pattern"]
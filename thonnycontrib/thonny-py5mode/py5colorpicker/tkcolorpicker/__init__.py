@@ -21,4 +21,5 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from .colorpicker import ColorPicker, askcolor, modeless_colorpicker
 from .alphabar import AlphaBar
 from .gradientbar import GradientBar
-from .colorsquare import ColorSquare
+from .colorsquare import ColorSquare, GradientCache
+from .framescheduler import FrameScheduler
@@ -42,6 +42,8 @@ class AlphaBar(tk.Canvas):
         """
         tk.Canvas.__init__(self, parent, width=width, height=height, **kwargs)
         self.gradient = tk.PhotoImage(master=self, width=width, height=height)
+        self._bg = None
+        self._alpha = None
 
         self._variable = variable
         if variable is not None:
@@ -73,27 +75,37 @@ class AlphaBar(tk.Canvas):
         width = self.winfo_width()
         height = self.winfo_height()
 
-        bg = create_checkered_image(width, height)
-        r, g, b = color
-        w = width - 1.
-        gradient = Image.new("RGBA", (width, height))
-        for i in range(width):
-            for j in range(height):
-                gradient.putpixel((i, j), (r, g, b, round2(i / w * 255)))
-        self.gradient = ImageTk.PhotoImage(Image.alpha_composite(bg, gradient),
-                                           master=self)
-
-        self.create_image(0, 0, anchor="nw", tags="gardient",
+        # the checkered background and the alpha ramp only depend on the size
+        self._bg = create_checkered_image(width, height)
+        w = max(width - 1., 1.)
+        ramp = bytes(round2(i / w * 255) for i in range(width))
+        self._alpha = Image.frombytes("L", (width, 1), ramp)
+        self._alpha = self._alpha.resize((width, height))
+        self.gradient = ImageTk.PhotoImage("RGBA", (width, height), master=self)
+        self._composite(color)
+
+        self.create_image(0, 0, anchor="nw", tags="gradient",
                           image=self.gradient)
         self.lower("gradient")
 
         x = alpha / 255. * width
-        h, s, v = rgb_to_hsv(r, g, b)
+        self.create_line(x, 0, x, height, width=2, tags='cursor')
+        self._set_cursor_fill(color)
+
+    def _composite(self, color):
+        """Recomposite the color layer over the cached background."""
+        layer = Image.new("RGB", self._bg.size, tuple(color))
+        layer.putalpha(self._alpha)
+        self.gradient.paste(Image.alpha_composite(self._bg, layer))
+
+    def _set_cursor_fill(self, color):
+        """Keep the cursor visible on dark colors."""
+        h, s, v = rgb_to_hsv(*color)
         if v < 50:
             fill = "gray80"
         else:
             fill = 'black'
-        self.create_line(x, 0, x, height, width=2, tags='cursor', fill=fill)
+        self.itemconfigure('cursor', fill=fill)
 
     def _on_click(self, event):
         """Move selection cursor on click."""
@@ -134,4 +146,11 @@ class AlphaBar(tk.Canvas):
             alpha = self.get()
         else:
             alpha = color[3]
-        self._draw_gradient(alpha, color[:3])
+        if self._bg is None or self._bg.size != (self.winfo_width(),
+                                                 self.winfo_height()):
+            self._draw_gradient(alpha, color[:3])
+        else:
+            self._composite(color[:3])
+            self._set_cursor_fill(color[:3])
+            x = alpha / 255. * self.winfo_width()
+            self.coords('cursor', x, 0, x, self.winfo_height())
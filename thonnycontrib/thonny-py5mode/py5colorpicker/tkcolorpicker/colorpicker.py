@@ -29,6 +29,7 @@ from .gradientbar import GradientBar
 from .colorsquare import ColorSquare
 from .spinbox import Spinbox
 from .limitvar import LimitVar
+from .framescheduler import FrameScheduler
 from locale import getdefaultlocale
 import re
 import pyperclip
@@ -156,7 +157,7 @@ class ColorPicker(tk.Toplevel):
         square = ttk.Frame(self, borderwidth=2, relief='groove')
         self.square = ColorSquare(square, hue=hue, width=200, height=200,
                                   color=rgb_to_hsv(*self._old_color),
-                                  highlightthickness=0)
+                                  prefill=True, highlightthickness=0)
         self.square.pack()
 
         frame = ttk.Frame(self)
@@ -323,8 +324,11 @@ class ColorPicker(tk.Toplevel):
             self.alphabar.bind("<ButtonRelease-1>", self._change_alpha, True)
             self.alphabar.bind("<Button-1>", self._unfocus, True)
         self.square.bind("<Button-1>", self._unfocus, True)
-        self.square.bind("<ButtonRelease-1>", self._change_sel_color, True)
-        self.square.bind("<B1-Motion>", self._change_sel_color, True)
+        # motion events come faster than frames: refresh once per frame
+        self.sel_color_updates = FrameScheduler(self, self._change_sel_color)
+        self.square.bind("<ButtonRelease-1>", self.sel_color_updates.flush,
+                         True)
+        self.square.bind("<B1-Motion>", self.sel_color_updates.schedule, True)
         s_red.bind('<FocusOut>', self._update_color_rgb)
         s_green.bind('<FocusOut>', self._update_color_rgb)
         s_blue.bind('<FocusOut>', self._update_color_rgb)
@@ -361,6 +365,11 @@ class ColorPicker(tk.Toplevel):
         """Return selected color, return an empty string if no color is selected."""
         return self.color
 
+    def destroy(self):
+        """Drop pending updates before destroying the dialog."""
+        self.sel_color_updates.cancel()
+        tk.Toplevel.destroy(self)
+
     @staticmethod
     def _select_all_spinbox(event):
         """Select all entry content."""
@@ -20,13 +20,76 @@ Color square gradient with selection cross
 """
 
 
+from collections import OrderedDict
+from PIL import ImageTk
 from .functions import tk, round2, rgb_to_hexa, hue2col, rgb_to_hsv
+from .functions import create_square_gradient
+
+
+class GradientCache:
+    """Least recently used cache of ColorSquare gradients."""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        """
+        Create a GradientCache.
+
+        Arguments:
+            * max_bytes: memory cap for the cached images, the least recently
+                         used gradients are dropped once it is exceeded
+        """
+        self._images = OrderedDict()
+        self._nbytes = 0
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def _size(image):
+        width, height = image.size
+        return width * height * len(image.getbands())
+
+    def __contains__(self, key):
+        return key in self._images
+
+    def __len__(self):
+        return len(self._images)
+
+    def is_full(self, width, height):
+        """Return True if one more width x height gradient would evict one."""
+        return self._nbytes + width * height * 3 > self.max_bytes
+
+    def get(self, hue, width, height):
+        """Return the gradient for hue, rendering and caching it if needed."""
+        key = (hue, width, height)
+        image = self._images.get(key)
+        if image is None:
+            image = create_square_gradient(hue2col(hue), width, height)
+            self._images[key] = image
+            self._nbytes += self._size(image)
+            self._evict()
+        else:
+            self._images.move_to_end(key)
+        return image
+
+    def _evict(self):
+        """Drop least recently used gradients until under the memory cap."""
+        while self._nbytes > self.max_bytes and len(self._images) > 1:
+            __, image = self._images.popitem(last=False)
+            self._nbytes -= self._size(image)
+
+    def clear(self):
+        """Empty the cache."""
+        self._images.clear()
+        self._nbytes = 0
+
+
+# shared by all color squares since they render the same gradients
+gradient_cache = GradientCache()
 
 
 class ColorSquare(tk.Canvas):
     """Square color gradient with selection cross."""
 
-    def __init__(self, parent, hue, color=None, height=256, width=256, **kwargs):
+    def __init__(self, parent, hue, color=None, height=256, width=256,
+                 cache=None, prefill=False, **kwargs):
         """
         Create a ColorSquare.
 
@@ -35,10 +98,16 @@ class ColorSquare(tk.Canvas):
             * hue: color square gradient for given hue (color in top right corner
                    is (hue, 100, 100) in HSV
             * color: initially selected color given in HSV
+            * cache: GradientCache to use, the shared gradient_cache by default
+            * prefill: render the gradients of all integer hues when idle
             * width, height and any keyword option accepted by a tkinter Canvas
         """
         tk.Canvas.__init__(self, parent, height=height, width=width, **kwargs)
-        self.bg = tk.PhotoImage(width=width, height=height, master=self)
+        self.bg = ImageTk.PhotoImage("RGB", (width, height), master=self)
+        self._image = None
+        self._cache = gradient_cache if cache is None else cache
+        self._prefill_hues = list(range(361)) if prefill else []
+        self._prefill_id = None
         self._hue = hue
         if not color:
             color = hue2col(self._hue)
@@ -48,24 +117,37 @@ class ColorSquare(tk.Canvas):
 
     def _fill(self):
         """Create the gradient."""
-        r, g, b = hue2col(self._hue)
         width = self.winfo_width()
         height = self.winfo_height()
-        h = float(height - 1)
-        w = float(width - 1)
-        if height:
-            c = [(r + i / h * (255 - r), g + i / h * (255 - g), b + i / h * (255 - b)) for i in range(height)]
-            data = []
-            for i in range(height):
-                line = []
-                for j in range(width):
-                    rij = round2(j / w * c[i][0])
-                    gij = round2(j / w * c[i][1])
-                    bij = round2(j / w * c[i][2])
-                    color = rgb_to_hexa(rij, gij, bij)
-                    line.append(color)
-                data.append("{" + " ".join(line) + "}")
-            self.bg.put(" ".join(data))
+        if height and width:
+            self._image = self._cache.get(self._hue, width, height)
+            self.bg.paste(self._image)
+            if self._prefill_hues and self._prefill_id is None:
+                self._prefill_id = self.after_idle(self._prefill)
+
+    def _prefill(self):
+        """Render one more gradient into the cache, then yield to Tk."""
+        self._prefill_id = None
+        width = self.winfo_width()
+        height = self.winfo_height()
+        # start with the hues closest to the current one
+        self._prefill_hues.sort(key=lambda h: -abs(h - self._hue))
+        while self._prefill_hues:
+            if self._cache.is_full(width, height):
+                self._prefill_hues = []
+                return
+            hue = self._prefill_hues.pop()
+            if (hue, width, height) not in self._cache:
+                self._cache.get(hue, width, height)
+                self._prefill_id = self.after_idle(self._prefill)
+                return
+
+    def destroy(self):
+        """Cancel pending prefill before destroying the canvas."""
+        if self._prefill_id is not None:
+            self.after_cancel(self._prefill_id)
+            self._prefill_id = None
+        tk.Canvas.destroy(self)
 
     def _draw(self, color):
         """Draw the gradient and the selection cross on the canvas."""
@@ -75,7 +157,7 @@ class ColorSquare(tk.Canvas):
         self.delete("cross_h")
         self.delete("cross_v")
         del self.bg
-        self.bg = tk.PhotoImage(width=width, height=height, master=self)
+        self.bg = ImageTk.PhotoImage("RGB", (width, height), master=self)
         self._fill()
         self.create_image(0, 0, image=self.bg, anchor="nw", tags="bg")
         self.tag_lower("bg")
@@ -123,11 +205,7 @@ class ColorSquare(tk.Canvas):
         y = self.coords('cross_h')[1]
         xp = min(x, self.bg.width() - 1)
         yp = min(y, self.bg.height() - 1)
-        try:
-            r, g, b = self.bg.get(round2(xp), round2(yp))
-        except ValueError:
-            r, g, b = self.bg.get(round2(xp), round2(yp)).split()
-            r, g, b = int(r), int(g), int(b)
+        r, g, b = self._image.getpixel((round2(xp), round2(yp)))
         hexa = rgb_to_hexa(r, g, b)
         h = self.get_hue()
         s = round2((1 - float(y) / self.winfo_height()) * 100)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Coalescing update scheduler for the thonny-py5mode color selector
+"""
+
+
+from time import perf_counter
+
+
+class FrameScheduler:
+    """
+    Coalesce bursts of events into at most one update per display frame.
+
+    Each call to schedule replaces the pending update, so only the latest
+    event of a burst is applied. Latency between the first coalesced event
+    and the matching update is recorded, see stats.
+    """
+
+    def __init__(self, widget, callback, frame_ms=8):
+        """
+        Create a FrameScheduler.
+
+        Arguments:
+            * widget: any tkinter widget, used for its after/after_idle
+            * callback: function called with the latest scheduled event
+            * frame_ms: minimum delay between two updates (8 ms keeps up
+                        with 120 Hz mice)
+        """
+        self._widget = widget
+        self._callback = callback
+        self.frame_ms = frame_ms
+        self._after_id = None
+        self._event = None
+        self._first_event_time = None
+        self._last_update_time = 0.
+        self.events = 0
+        self.updates = 0
+        self.max_latency = 0.
+        self.total_latency = 0.
+
+    def schedule(self, event=None):
+        """Register event, the update is applied on the next frame."""
+        now = perf_counter()
+        self.events += 1
+        self._event = event
+        if self._first_event_time is None:
+            self._first_event_time = now
+        if self._after_id is None:
+            wait = self.frame_ms - (now - self._last_update_time) * 1000
+            if wait <= 0:
+                self._after_id = self._widget.after_idle(self._update)
+            else:
+                self._after_id = self._widget.after(int(wait) + 1,
+                                                    self._update)
+
+    def flush(self, event=None):
+        """Apply event (or the pending one) right away."""
+        if event is not None:
+            self.schedule(event)
+        if self._after_id is not None:
+            self._widget.after_cancel(self._after_id)
+            self._update()
+
+    def cancel(self):
+        """Drop the pending update, if any."""
+        if self._after_id is not None:
+            self._widget.after_cancel(self._after_id)
+        self._after_id = None
+        self._event = None
+        self._first_event_time = None
+
+    def _update(self):
+        now = perf_counter()
+        latency = now - self._first_event_time
+        event = self._event
+        self._after_id = None
+        self._event = None
+        self._first_event_time = None
+        self._last_update_time = now
+        self.updates += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self._callback(event)
+
+    def stats(self):
+        """
+        Return a dict with the number of events and updates, how many events
+        were coalesced and the mean/max event to update latency in ms.
+        """
+        mean = self.total_latency / self.updates if self.updates else 0.
+        return {"events": self.events,
+                "updates": self.updates,
+                "coalesced": self.events - self.updates,
+                "mean_latency_ms": mean * 1000,
+                "max_latency_ms": self.max_latency * 1000}
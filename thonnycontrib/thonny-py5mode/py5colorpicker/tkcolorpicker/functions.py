@@ -26,7 +26,7 @@ try:
 except ImportError:
     import Tkinter as tk
     import ttk
-from PIL import Image, ImageDraw, ImageTk
+from PIL import Image, ImageChops, ImageDraw, ImageTk
 from math import atan2, sqrt, pi
 import colorsys
 
@@ -58,14 +58,33 @@ def hsv_to_rgb(h, s, v):
     return round2(r * 255), round2(g * 255), round2(b * 255)
 
 
+# --- lookup tables
+# hex pair of every byte value, for rgb_to_hexa
+HEXA_TABLE = tuple("%2.2X" % i for i in range(256))
+# RGB color of (h, 100, 100) in HSV for every integer hue, for hue2col
+HUE_TABLE = tuple(hsv_to_rgb(h, 100, 100) for h in range(361))
+
+
 def rgb_to_hexa(*args):
     """Convert RGB(A) color to hexadecimal."""
-    if len(args) == 3:
-        return ("#%2.2x%2.2x%2.2x" % tuple(args)).upper()
-    elif len(args) == 4:
-        return ("#%2.2x%2.2x%2.2x%2.2x" % tuple(args)).upper()
-    else:
-        raise ValueError("Wrong number of arguments.")
+    table = HEXA_TABLE
+    try:
+        if len(args) == 3:
+            r, g, b = args
+            if 0 <= r <= 255 and 0 <= g <= 255 and 0 <= b <= 255:
+                return "#" + table[r] + table[g] + table[b]
+        elif len(args) == 4:
+            r, g, b, a = args
+            if 0 <= r <= 255 and 0 <= g <= 255 and 0 <= b <= 255 \
+                    and 0 <= a <= 255:
+                return "#" + table[r] + table[g] + table[b] + table[a]
+        else:
+            raise ValueError("Wrong number of arguments.")
+    except TypeError:
+        pass  # not integers
+    # not bytes (negative indices would wrap), let string formatting deal
+    # with it as before the table
+    return ("#" + "%2.2x" * len(args) % args).upper()
 
 
 def hexa_to_rgb(color):
@@ -90,6 +109,8 @@ def hue2col(h):
     """Return the color in RGB format corresponding to (h, 100, 100) in HSV."""
     if h < 0 or h > 360:
         raise ValueError("Hue should be between 0 and 360")
+    elif h == int(h):
+        return HUE_TABLE[int(h)]
     else:
         return hsv_to_rgb(h, 100, 100)
 
@@ -118,6 +139,32 @@ def create_checkered_image(width, height, c1=(154, 154, 154, 255),
     return im
 
 
+def create_square_gradient(color, width, height):
+    """
+    Return the saturation/value gradient of a ColorSquare as an RGB image.
+
+    The color fades to white from top to bottom and the result fades to
+    black from right to left. Each channel is the product of two one
+    pixel wide ramps, so no per-pixel Python code is involved.
+
+    Arguments:
+        * color: color of the top right corner (RGB)
+        * width: image width
+        * height: image height
+    """
+    w = float(max(width - 1, 1))
+    h = float(max(height - 1, 1))
+    value = bytes(round2(j / w * 255) for j in range(width))
+    value = Image.frombytes("L", (width, 1), value).resize((width, height))
+    bands = []
+    for c in color:
+        saturation = bytes(round2(c + i / h * (255 - c)) for i in range(height))
+        saturation = Image.frombytes("L", (1, height), saturation)
+        bands.append(ImageChops.multiply(saturation.resize((width, height)),
+                                         value))
+    return Image.merge("RGB", bands)
+
+
 def overlay(image, color):
     """
     Overlay a rectangle of color (RGBA) on the image and return the result.
@@ -0,0 +1,69 @@
+"""locate py5_tools' run_sketch.py for imported mode
+the result is cached per backend interpreter, a run only checks that the
+cached file is still there
+"""
+
+import pathlib
+import site
+import sysconfig
+from importlib import util
+
+from thonny import get_workbench
+
+_RUN_SKETCH = pathlib.Path("py5_tools", "tools", "run_sketch.py")
+_resolved: dict[tuple, pathlib.Path] = {}
+
+
+class RunSketchNotFoundError(FileNotFoundError):
+    """raised when no py5_tools run_sketch.py can be found"""
+
+    def __init__(self, searched: list[pathlib.Path]):
+        self.searched = searched
+        locations = "\n".join(str(location) for location in searched)
+        super().__init__(
+            "Could not find the py5 sketch runner (run_sketch.py).\n"
+            "Is py5 installed? Looked in:\n" + locations
+        )
+
+
+def get_cache_key() -> tuple:
+    """identify the backend interpreter the path belongs to"""
+    backend_name = get_workbench().get_option("run.backend_name")
+    executable = get_workbench().get_option(backend_name + ".executable", None)
+    return backend_name, executable
+
+
+def get_run_sketch_candidates() -> list[pathlib.Path]:
+    """list the places where py5_tools run_sketch.py may be installed"""
+    candidates = [
+        pathlib.Path(site.getusersitepackages()) / _RUN_SKETCH,
+        *(pathlib.Path(p) / _RUN_SKETCH for p in site.getsitepackages()),
+        # what distutils.sysconfig.get_python_lib() used to return
+        pathlib.Path(sysconfig.get_paths()["purelib"]) / _RUN_SKETCH,
+    ]
+    spec = util.find_spec("py5_tools")
+    if spec and spec.submodule_search_locations:
+        plug_packages = spec.submodule_search_locations[0]
+        candidates.append(pathlib.Path(plug_packages, "tools", "run_sketch.py"))
+    return candidates
+
+
+def get_run_sketch_path() -> pathlib.Path:
+    """return the path of run_sketch.py, probing the candidate locations
+    only once per backend interpreter, or again if py5 was removed since"""
+    key = get_cache_key()
+    if key not in _resolved or not _resolved[key].is_file():
+        candidates = get_run_sketch_candidates()
+        for location in candidates:
+            # first location that matches a py5_tools install wins
+            if location.is_file():
+                _resolved[key] = location
+                break
+        else:
+            raise RunSketchNotFoundError(candidates)
+    return _resolved[key]
+
+
+def clear_run_sketch_cache() -> None:
+    """forget resolved locations, e.g. after (re)installing py5 or the jdk"""
+    _resolved.clear()
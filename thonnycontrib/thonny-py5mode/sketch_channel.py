@@ -0,0 +1,89 @@
+"""frontend end of the side channel to running sketches
+see backend > py5_channel.py for the protocol; connections are accepted
+and read in threads, their frames are handed to tk by polling (like thonny
+does with backend messages, event_generate across threads isn't reliable)
+"""
+
+import queue
+import secrets
+import socket
+import threading
+from logging import getLogger
+from typing import Callable
+
+from thonnycontrib.backend.py5_channel import (
+    HELLO,
+    check_token,
+    encode_frame,
+    read_frame,
+)
+
+logger = getLogger(__name__)
+
+# how often frames received from the sketch are handled
+POLL_MS = 50
+
+
+class ChannelServer:
+    """listen for the backend's connection, calling handlers[type](payload)
+    in tk's thread for each frame received"""
+
+    def __init__(self, widget):
+        self.widget = widget  # any tk widget, for its after()
+        self.handlers: dict[int, Callable[[bytes], None]] = {}
+        self.token = secrets.token_hex(16)
+        self.frames = queue.SimpleQueue()
+        self.connection = None  # the latest backend's, commands go there
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self._accept, name="py5_channel", daemon=True).start()
+        self.widget.after(POLL_MS, self._poll)
+
+    @property
+    def address(self) -> str:
+        """what the backend needs to connect, as passed in its environment"""
+        return f"{self.port}:{self.token}"
+
+    def send(self, kind: int, payload: bytes = b"") -> None:
+        """send a command to the running backend, if any is connected"""
+        connection = self.connection
+        if connection is not None:
+            try:
+                connection.sendall(encode_frame(kind, payload))
+            except OSError:
+                pass  # the backend is gone, the next one connects anew
+
+    def _accept(self) -> None:
+        while True:
+            connection, _ = self.listener.accept()
+            threading.Thread(
+                target=self._read, args=(connection,), daemon=True
+            ).start()
+
+    def _read(self, connection: socket.socket) -> None:
+        with connection, connection.makefile("rb") as stream:
+            try:
+                kind, token = read_frame(stream) or (None, b"")
+                if kind != HELLO or not check_token(token, self.token):
+                    return  # not our backend
+                self.connection = connection
+                while frame := read_frame(stream):
+                    self.frames.put(frame)
+            except (OSError, ValueError):
+                logger.exception("py5 channel connection lost")
+            finally:
+                if self.connection is connection:
+                    self.connection = None
+
+    def _poll(self) -> None:
+        try:
+            while True:
+                kind, payload = self.frames.get_nowait()
+                handler = self.handlers.get(kind)
+                if handler:
+                    handler(payload)
+        except queue.Empty:
+            pass
+        except Exception:
+            logger.exception("py5 channel frame not handled")
+        self.widget.after(POLL_MS, self._poll)
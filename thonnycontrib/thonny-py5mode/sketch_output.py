@@ -0,0 +1,196 @@
+"""filter sketch output on its way to thonny's shell
+py5 reports display window moves as "__MOVE__ x y" lines (external mode),
+these are taken out of the output wherever they are, even split between
+chunks, and only the last location is saved, once the window settles;
+the rest is batched, so a sketch printing every frame doesn't keep the
+shell (and the print() calls waiting for it) busy
+"""
+
+import collections
+import re
+import time
+from logging import getLogger
+from typing import Callable
+
+from thonny import get_workbench
+
+logger = getLogger(__name__)
+
+MOVE_MARKER = "__MOVE__"
+MOVE_REGEX = re.compile(r"__MOVE__ (-?\d+) (-?\d+)[ \t]*\r?\n")
+# what a move line looks like before its newline has arrived
+PARTIAL_MOVE_REGEX = re.compile(r"__MOVE__(?: -?\d*(?: -?\d*[ \t]*\r?)?)?")
+# longest output tail that may still become a move line
+MAX_PARTIAL_LENGTH = 64
+# delay before saving the last location, a drag moves many times a second
+SAVE_DELAY_MS = 500
+# delay before held back output that didn't become a move line is shown
+FLUSH_DELAY_MS = 100
+# one shell update per couple of frames at 60 fps
+THROTTLE_INTERVAL_MS = 33
+# how often a line that keeps repeating gets its count shown
+REPEAT_REPORT_MS = 1000
+
+
+def get_partial_length(text: str) -> int:
+    """length of the end of text that may be the start of a move line"""
+    start = max(0, len(text) - MAX_PARTIAL_LENGTH)
+    position = text.find("_", start)
+    while position != -1:
+        tail = text[position:]
+        if MOVE_MARKER.startswith(tail) or PARTIAL_MOVE_REGEX.fullmatch(tail):
+            return len(tail)
+        position = text.find("_", position + 1)
+    return 0
+
+
+class MoveFilter:
+    """remove move lines from output chunks, calling on_move(x, y) with the
+    last location in each chunk"""
+
+    def __init__(self, on_move: Callable[[int, int], None]):
+        self.on_move = on_move
+        self.held = {}  # stream name -> output that may start a move line
+
+    def feed(self, data: str, stream_name: str) -> str:
+        """return the output of data to show in the shell"""
+        text = self.held.pop(stream_name, "") + data
+        if "_" not in text:
+            return text  # most output, no need for regular expressions
+
+        moves = MOVE_REGEX.findall(text)
+        if moves:
+            text = MOVE_REGEX.sub("", text)
+            self.on_move(*map(int, moves[-1]))
+
+        partial_length = get_partial_length(text)
+        if partial_length:
+            self.held[stream_name] = text[-partial_length:]
+            text = text[:-partial_length]
+        return text
+
+    def flush(self) -> dict[str, str]:
+        """return (and forget) the output held back, per stream"""
+        held, self.held = self.held, {}
+        return held
+
+
+class LocationSaver:
+    """save the last reported location SAVE_DELAY_MS after the first one,
+    a single config update per window drag instead of one per move"""
+
+    def __init__(self, widget, option: str):
+        self.widget = widget  # any tk widget, for its after()
+        self.option = option
+        self.location = None
+        self._after_id = None
+
+    def update(self, x: int, y: int) -> None:
+        self.location = (x, y)
+        if self._after_id is None:
+            self._after_id = self.widget.after(SAVE_DELAY_MS, self.save)
+
+    def save(self) -> None:
+        self._after_id = None
+        # stored as a tuple, the old "x,y" strings also read back as one
+        if get_workbench().get_option(self.option) != self.location:
+            get_workbench().set_option(self.option, self.location)
+
+
+class OutputThrottle:
+    """pass output to emit(data, stream_name) once per THROTTLE_INTERVAL_MS,
+    keeping the newest max_lines lines of each batch (the shell would discard
+    older ones right away) and, if collapse is set, counting repeated lines
+    instead of showing them"""
+
+    def __init__(self, widget, emit: Callable[[str, str], None], max_lines: int):
+        self.widget = widget  # any tk widget, for its after()
+        self.emit = emit
+        self.collapse = False
+        self.lines = collections.deque(maxlen=max(max_lines, 1))
+        self.dropped = 0
+        self.last_line = None  # (stream name, line) being collapsed
+        self.repeats = 0
+        self.repeats_since = 0.0
+        self.stats = collections.Counter()
+        self.worst_flush = 0.0
+        self._after_id = None
+
+    def feed(self, data: str, stream_name: str) -> None:
+        for line in data.splitlines(keepends=True):
+            if self.collapse and (stream_name, line) == self.last_line:
+                if not self.repeats:
+                    self.repeats_since = time.monotonic()
+                self.repeats += 1
+                continue
+            self._add_repeats()
+            self._add(stream_name, line)
+            # only whole lines are compared, print(end="") may follow
+            self.last_line = (stream_name, line) if line[-1] == "\n" else None
+        if self._after_id is None:
+            self._after_id = self.widget.after(THROTTLE_INTERVAL_MS, self.flush)
+
+    def flush(self, final: bool = False) -> None:
+        """show the batched output, final when the program has ended"""
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        elapsed = time.monotonic() - self.repeats_since
+        if self.repeats and (final or elapsed * 1000 >= REPEAT_REPORT_MS):
+            self._add_repeats()
+        if final:
+            self.last_line = None
+
+        started = time.perf_counter()
+        if self.dropped:
+            self.emit(f"[{self.dropped} lines of output skipped]\n", "stderr")
+            self.stats["dropped"] += self.dropped
+            self.dropped = 0
+        # consecutive lines of the same stream go to the shell together
+        chunk, chunk_stream = [], None
+        for stream_name, line in self.lines:
+            if stream_name != chunk_stream and chunk:
+                self.emit("".join(chunk), chunk_stream)
+                chunk = []
+            chunk.append(line)
+            chunk_stream = stream_name
+        if chunk:
+            self.emit("".join(chunk), chunk_stream)
+        self.stats["lines"] += len(self.lines)
+        self.lines.clear()
+
+        elapsed = time.perf_counter() - started
+        self.stats["flushes"] += 1
+        self.stats["flush_seconds"] += elapsed
+        self.worst_flush = max(self.worst_flush, elapsed)
+        if final and self.stats["lines"]:
+            self.log_stats()
+
+    def log_stats(self) -> None:
+        """log (and reset) the shell's share of the ui thread for the run"""
+        stats = self.stats
+        logger.info(
+            "py5 output: %d lines in %d flushes, %d skipped, %d collapsed, "
+            "%.2f ms per flush, worst %.2f ms",
+            stats["lines"],
+            stats["flushes"],
+            stats["dropped"],
+            stats["collapsed"],
+            stats["flush_seconds"] * 1000 / stats["flushes"],
+            self.worst_flush * 1000,
+        )
+        self.stats.clear()
+        self.worst_flush = 0.0
+
+    def _add(self, stream_name: str, line: str) -> None:
+        if len(self.lines) == self.lines.maxlen:
+            self.dropped += 1
+        self.lines.append((stream_name, line))
+
+    def _add_repeats(self) -> None:
+        if self.repeats:
+            stream_name = self.last_line[0]
+            notice = f"[previous line repeated {self.repeats} times]\n"
+            self._add(stream_name, notice)
+            self.stats["collapsed"] += self.repeats
+            self.repeats = 0